@@ -0,0 +1,289 @@
+"""
+benchmarks.py
+Standalone benchmarks for the game's most expensive systems.
+Run with `python benchmarks.py` from this directory, optionally with `--json results.json` to save the results
+for comparing between releases. Dungeons are built from the map1 levels, and every benchmark is seeded.
+`python benchmarks.py --replay replay.json` instead fast-forwards a recorded run and prints it's frame percentiles.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import arcade
+import numpy as np
+
+from config import Config
+from map import Dungeon
+from mobs import Enemy, MobHandler, MobStore, PhysicsEngine, Player
+from path import SEARCHES
+from projectiles import BulletSystem
+from world import Recording
+
+MOB_COUNTS = (6, 50, 200, 1000)
+
+
+def seed(value: int) -> None:
+    """
+    Seeds every random number generator the game uses.
+    """
+    random.seed(value)
+    np.random.seed(value)
+
+
+def measure(function: Callable[[], object], runs: int) -> Dict[str, float]:
+    """
+    Times a function over several runs.
+
+    :param function: The function to time.
+    :param runs: The number of times to call it.
+    :return: The mean, median, fastest and slowest run, in milliseconds.
+    """
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'mean': statistics.mean(times), 'median': statistics.median(times),
+            'min': min(times), 'max': max(times), 'runs': runs}
+
+
+def build_dungeon(size: int = 3) -> Dungeon:
+    """
+    :return: A new Dungeon, without it printing it's layout.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Dungeon(0, size)
+
+
+def benchmark_dungeon(runs: int = 10, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times building Dungeons of a few sizes.
+    """
+
+    results = {}
+    for size in (3, 5):
+        seed(seed_value)
+        results[f'dungeon_{size}x{size}'] = measure(lambda: build_dungeon(size), runs)
+    return results
+
+
+def benchmark_finders(size: int = 3, searches: int = 200, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times every search in path.SEARCHES on the same randomly chosen tile pairs.
+
+    :param size: The size of the Dungeon to search.
+    :param searches: The number of tile pairs to search between.
+    :param seed_value: Seeds the Dungeon's layout and the tile pairs.
+    :return: The setup time and the average time per search, in milliseconds, for each search.
+    """
+
+    seed(seed_value)
+    dungeon = build_dungeon(size)
+    tiles = np.argwhere(dungeon.walkable)
+    rng = np.random.RandomState(seed_value)
+    pairs = [(tuple(tiles[a]), tuple(tiles[b])) for a, b in rng.randint(len(tiles), size=(searches, 2))]
+
+    results = {}
+    for name, search in SEARCHES.items():
+        start = time.perf_counter()
+        finder = search(dungeon.walkable)
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for a, b in pairs:
+            finder(a, b)
+        results[name] = {'setup': setup * 1000, 'search': (time.perf_counter() - start) / searches * 1000}
+    return results
+
+
+def benchmark_get_path(searches: int = 200, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times Enemy.get_path between random tiles, both searching and reading back from the Dungeon's path cache.
+    """
+
+    seed(seed_value)
+    dungeon = build_dungeon()
+    tiles = np.argwhere(dungeon.walkable) * Config.TILE_SIZE
+    rng = np.random.RandomState(seed_value)
+    pairs = tiles[rng.randint(len(tiles), size=(searches, 2))]
+
+    store = MobStore()
+    enemy = Enemy(dungeon=dungeon, filename="resources/images/monsters/ghost/ghost1.png", scale=4)
+    store.add(enemy, 'ghost')
+
+    def walk() -> None:
+        for start, end in pairs:
+            enemy.center_x, enemy.center_y = start
+            enemy.path_goal = None
+            enemy.get_path(tuple(end))
+
+    dungeon.path_cache.clear()
+    results = {'get_path_search': measure(walk, 1), 'get_path_cached': measure(walk, 1)}
+    for result in results.values():
+        result['per_path'] = result['mean'] / searches
+    dungeon.close()
+    return results
+
+
+def benchmark_walls(queries: int = 2000, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times checking a Sprite against the walls at random spots, through the WallIndex and by the full wall list.
+    """
+
+    seed(seed_value)
+    dungeon = build_dungeon()
+    walls = arcade.SpriteList()
+    for level in dungeon.levelList:
+        walls.extend(level.wallSprites)
+    sprite = arcade.Sprite("resources/images/monsters/ghost/ghost1.png", 4)
+    rng = np.random.RandomState(seed_value)
+    spots = rng.uniform(0, dungeon.size * Config.LEVEL_SIZE, size=(queries, 2)).tolist()
+
+    def query(check: Callable[[arcade.Sprite], List[arcade.Sprite]]) -> Callable[[], None]:
+        def run() -> None:
+            for spot in spots:
+                sprite.position = spot
+                check(sprite)
+        return run
+
+    results = {
+        'walls_indexed': measure(query(dungeon.wall_index.collisions), 3),
+        'walls_brute_force': measure(query(lambda s: arcade.check_for_collision_with_list(s, walls)), 1),
+    }
+    for result in results.values():
+        result['per_query'] = result['mean'] / queries
+    dungeon.close()
+    return results
+
+
+def setup_mobs(count: int, seed_value: int = 0) -> MobHandler:
+    """
+    :return: A MobHandler with the given number of enemies, around a player in a new Dungeon.
+    """
+
+    seed(seed_value)
+    dungeon = build_dungeon()
+    player = Player(dungeon=dungeon)
+    player.center_x, player.center_y = dungeon.levelList[len(dungeon.levelList) // 2].center()
+    player.collisions = PhysicsEngine(player, dungeon.wall_index)
+    handler = MobHandler(rng=random.Random(seed_value))
+    handler.setup(count // 2, count - count // 2, player, dungeon)
+    return handler
+
+
+def viewport(handler: MobHandler) -> tuple:
+    """
+    :return: A viewport centered on the MobHandler's player.
+    """
+    x, y = handler.player.position
+    return (x - Config.SCREEN_WIDTH / 2, x + Config.SCREEN_WIDTH / 2,
+            y - Config.SCREEN_HEIGHT / 2, y + Config.SCREEN_HEIGHT / 2)
+
+
+def benchmark_bullets(counts=(100, 1000, 5000), frames: int = 30, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times BulletSystem.update with many bullets flying out from the player through 200 enemies.
+    """
+
+    results = {}
+    for count in counts:
+        handler = setup_mobs(200, seed_value)
+        bullets = BulletSystem(handler.dungeon.walkable)
+        x, y = handler.player.position
+        rng = np.random.RandomState(seed_value)
+        angles = rng.uniform(0, 2 * np.pi, count)
+        bullets.volley((x, y), np.column_stack([x + np.cos(angles), y + np.sin(angles)]).tolist())
+        results[f'bullets_{count}'] = measure(lambda: bullets.update(handler.store), frames)
+        handler.dungeon.close()
+    return results
+
+
+def benchmark_mob_update(counts=MOB_COUNTS, frames: int = 60, seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times a full MobHandler.update with different numbers of enemies.
+    """
+
+    results = {}
+    for count in counts:
+        handler = setup_mobs(count, seed_value)
+        view = viewport(handler)
+        results[f'mob_update_{count}'] = measure(lambda: handler.update(view), frames)
+        handler.dungeon.close()
+    return results
+
+
+def run_all(seed_value: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every benchmark.
+
+    :return: Each benchmark's timings, in milliseconds.
+    """
+
+    results = {}
+    results.update(benchmark_dungeon(seed_value=seed_value))
+    for size in (3, 10):
+        for name, result in benchmark_finders(size, seed_value=seed_value).items():
+            results[f'finder_{name}_{size}x{size}'] = result
+    results.update(benchmark_get_path(seed_value=seed_value))
+    results.update(benchmark_walls(seed_value=seed_value))
+    results.update(benchmark_bullets(seed_value=seed_value))
+    results.update(benchmark_mob_update(seed_value=seed_value))
+    return results
+
+
+def replay(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Replays a Recording without drawing it.
+
+    :param path: A Recording saved by the game.
+    :return: The 50th, 95th and 99th percentile time of each phase over the last ticks, in milliseconds.
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        world = Recording.load(path).replay()
+    world.close()
+    return {phase: dict(zip(('p50', 'p95', 'p99'), values)) for phase, values in world.profiler.report().items()}
+
+
+def main() -> None:
+    """
+    Runs all of the benchmarks and prints their results, saving them as JSON if asked to.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--json', help='A file to save the results to.')
+    parser.add_argument('--seed', type=int, default=0, help='Seeds every benchmark.')
+    parser.add_argument('--replay', help='A recorded run to replay instead of running the benchmarks.')
+    args = parser.parse_args()
+
+    results = replay(args.replay) if args.replay else run_all(args.seed)
+    for name, result in results.items():
+        print(f'{name:>28}: ' + ', '.join(f'{key} {value:9.3f}' for key, value in result.items() if key != 'runs'))
+    if not args.replay:
+        print('hpa only refines the steps inside the starting room, the other searches return every step.')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({
+                'seed': args.seed,
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'arcade': arcade.version.VERSION,
+                'platform': platform.platform(),
+                'config': {'PATH_FINDER': Config.PATH_FINDER, 'PATH_WORKERS': Config.PATH_WORKERS,
+                           'CHASE_FLOW_FIELD': Config.CHASE_FLOW_FIELD},
+                'results': results,
+            }, file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
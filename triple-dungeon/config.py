@@ -4,6 +4,7 @@ Holds all constants used for setting up the game.
 May later hold functions for loading/saving configuration files.
 """
 
+import math
 import os
 
 from enum import Enum
@@ -56,6 +57,51 @@ class Config(object):
     # Monster Count to be spawned
     MONSTER_COUNT = 6
 
+    # Chasing monsters share a single flow field towards the player instead of each running A*
+    CHASE_FLOW_FIELD = True
+    # The search used for single paths: 'astar' for flat A*, 'jps' for Jump Point Search,
+    # or 'hpa' for hierarchical A* over the rooms
+    PATH_FINDER = 'hpa'
+    # Number of (start, goal) paths remembered by the Dungeon
+    PATH_CACHE_SIZE = 256
+    # Milliseconds per frame that may be spent searching for paths, leftover searches wait for the next frame
+    PATHFINDING_BUDGET_MS = 4
+    # Background workers used to search for paths, 0 searches on the main thread instead
+    PATH_WORKERS = 2
+    # Use worker processes rather than threads, so searches can run on spare cores
+    PATH_WORKER_PROCESSES = True
+
+    # Enemy AI level of detail, by distance from the player in pixels.
+    # Enemies within AI_FULL_RADIUS chase every frame, and within AI_REDUCED_RADIUS every AI_REDUCED_INTERVAL frames.
+    # Enemies further away wander while on screen, and lie dormant off screen.
+    AI_FULL_RADIUS = 300
+    AI_REDUCED_RADIUS = 600
+    AI_REDUCED_INTERVAL = 4
+    # Chance each frame that a wandering enemy picks somewhere new to walk to
+    AI_WANDER_CHANCE = 0.05
+    # Tiles around the player that the chase flow field covers. Enemies only chase within AI_REDUCED_RADIUS,
+    # the rest leaves room for paths to bend around walls
+    FLOW_FIELD_RADIUS = 2 * math.ceil(AI_REDUCED_RADIUS / TILE_SIZE)
+
+    # The font of the HUD's text
+    HUD_FONT = 'Arial'
+
+    # Simulation ticks per second, the game's speed no matter how fast it is drawn
+    TICK_RATE = 60
+    # Most ticks run per drawn frame, the game slows down rather than falling further behind when it can't keep up
+    MAX_SUBSTEPS = 5
+
+    # Frames the profiler takes it's percentiles over, and frames it keeps for CSV export
+    PROFILER_WINDOW = 300
+    PROFILER_HISTORY = 3600
+
+    # Seeds the dungeon, spawns and enemy wandering, None for a new seed every run
+    SEED = None
+    # Serve every path request on the main thread each frame, so a seed and it's inputs always replay the same way
+    DETERMINISTIC = False
+    # The file recorded inputs are saved to
+    REPLAY_FILE = 'replay.json'
+
 
 class Enums(Enum):
     """
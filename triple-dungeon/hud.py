@@ -0,0 +1,180 @@
+"""
+hud.py
+Draws the player's stats on top of the game, fixed to the screen rather than the world.
+"""
+
+import contextlib
+from typing import Iterator, Tuple
+
+import arcade
+import PIL.Image
+import PIL.ImageDraw
+import PIL.ImageFont
+from arcade.text import DEFAULT_FONT_NAMES
+
+from config import Config
+
+
+@contextlib.contextmanager
+def screen_space() -> Iterator[None]:
+    """
+    Draws the code run inside it in screen pixels, with (0, 0) at the bottom left corner of the window,
+    then puts the viewport back.
+    """
+
+    viewport = arcade.get_viewport()
+    arcade.set_viewport(0, Config.SCREEN_WIDTH, 0, Config.SCREEN_HEIGHT)
+    try:
+        yield
+    finally:
+        arcade.set_viewport(*viewport)
+
+
+class Label(arcade.Sprite):
+    """
+    A line of text drawn as a Sprite, with it's bottom left corner fixed in place.
+    The text is only rasterized when it changes, and each rasterized text is kept for every Label to reuse.
+    """
+
+    # Maps each text, color and font size to it's Texture
+    cache = {}
+    # The number of Textures kept before the cache is emptied
+    CACHE_SIZE = 512
+
+    def __init__(self, left: float, bottom: float, color: Tuple[int, int, int], font_size: float = 15,
+                 font_name: str = Config.HUD_FONT) -> None:
+        """
+        Initializes an empty Label.
+
+        :param left: The pixel position of the text's left edge.
+        :param bottom: The pixel position of the text's bottom edge.
+        :param color: The color of the text.
+        :param font_size: The size of the text, matching arcade.draw_text's sizes.
+        :param font_name: The font to use, or arcade's default fonts if it can't be found.
+        """
+
+        super(Label, self).__init__()
+        self.anchor = left, bottom
+        self.text_color = tuple(color)
+        self.font_size = font_size
+        self.font_name = font_name
+        self.text = None
+
+    def set_text(self, text: str) -> bool:
+        """
+        Shows new text, if it differs from the text shown.
+
+        :return: True if the text changed.
+        """
+
+        if text == self.text:
+            return False
+        self.text = text
+        self.texture = self.rasterize(text, self.text_color, self.font_size, self.font_name)
+        self.place(*self.anchor)
+        return True
+
+    def place(self, left: float, bottom: float) -> None:
+        """
+        Moves the Label, keeping it's text.
+
+        :param left: The pixel position of the text's left edge.
+        :param bottom: The pixel position of the text's bottom edge.
+        """
+
+        self.anchor = left, bottom
+        self.center_x, self.center_y = left + self.width / 2, bottom + self.height / 2
+
+    @classmethod
+    def rasterize(cls, text: str, color: Tuple[int, int, int], font_size: float, font_name: str) -> arcade.Texture:
+        """
+        :return: A Texture of the text, drawn with PIL.
+        """
+
+        key = (text, color, font_size, font_name)
+        texture = cls.cache.get(key)
+        if texture is not None:
+            return texture
+        if len(cls.cache) >= cls.CACHE_SIZE:
+            cls.cache.clear()
+
+        # Sized up the same way as arcade.draw_text, so both look alike
+        font = cls.font(font_name, int(font_size * 1.25))
+        right, bottom = cls.text_size(text, font)
+        image = PIL.Image.new('RGBA', (max(1, right), max(1, bottom)))
+        PIL.ImageDraw.Draw(image).text((0, 0), text, fill=color, font=font)
+
+        texture = cls.cache[key] = arcade.Texture(f'label {key}', image)
+        return texture
+
+    @staticmethod
+    def text_size(text: str, font: PIL.ImageFont.ImageFont) -> Tuple[int, int]:
+        """
+        :return: The width and height of the image needed to hold the text drawn at (0, 0).
+        """
+
+        draw = PIL.ImageDraw.Draw(PIL.Image.new('RGBA', (1, 1)))
+        # textbbox only exists from Pillow 8, and textsize was removed in Pillow 10
+        if hasattr(draw, 'textbbox'):
+            left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+            return right, bottom
+        return draw.textsize(text, font=font)
+
+    @staticmethod
+    def font(font_name: str, size: int) -> PIL.ImageFont.ImageFont:
+        """
+        :return: The first font found out of the one asked for and arcade's defaults, or PIL's built in font.
+        """
+
+        for name in (font_name, f'{font_name}.ttf') + DEFAULT_FONT_NAMES:
+            try:
+                return PIL.ImageFont.truetype(name, size)
+            except OSError:
+                continue
+        return PIL.ImageFont.load_default()
+
+
+class HUD(object):
+    """
+    Shows the player's health, armor and speed in the bottom left corner of the screen.
+    The stats are checked every frame, but their text is only made again when they change. Every Label stays at the
+    same spot on the screen, so the HUD is drawn with a single draw call without moving anything as the view scrolls.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the HUD's Labels.
+        """
+
+        self.health = Label(100, 60, arcade.color.RED)
+        self.armor = Label(100, 90, arcade.color.BLUE)
+        self.speed = Label(100, 120, arcade.color.YELLOW)
+        self.sprites = arcade.SpriteList()
+        self.sprites.extend((self.health, self.armor, self.speed))
+        # The stats last shown
+        self.stats = None
+
+    def update(self, player) -> bool:
+        """
+        Shows the player's current stats.
+
+        :param player: The Player to show.
+        :return: True if any stat changed since the last update.
+        """
+
+        stats = (player.health, player.max_health, player.armor, player.speed)
+        if stats == self.stats:
+            return False
+        self.stats = stats
+        self.health.set_text(f'Health:{player.health}/{player.max_health}')
+        self.armor.set_text(f'Armor:{player.armor}')
+        self.speed.set_text(f'Speed:{player.speed}')
+        return True
+
+    def draw(self) -> None:
+        """
+        Draws the stats over whatever is on screen.
+        """
+
+        with screen_space():
+            self.sprites.draw()
@@ -5,17 +5,14 @@ Holds the main game window, as well as manages basic functions for organizing th
 """
 
 import collections
-import math
-import random
 import time
 from typing import Tuple, List
 
 import arcade
-from config import Config
-from map import Dungeon
-from mobs import Player, MobHandler
-from projectiles import Temp
-from recipe import ActiveRecipe
+from config import Config, IMAGES
+from hud import HUD, Label, screen_space
+from sprites import textures
+from world import World
 
 
 class FPSCounter:
@@ -40,89 +37,92 @@ class FPSCounter:
 class Game(arcade.Window):
     """
     Main application class.
+    Draws a World and feeds it the player's inputs, the World itself holds all of the game's logic.
     """
 
     def __init__(self):
         # Call the parent class and set up the window
         super().__init__(Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT, Config.SCREEN_TITLE)
-
-        # Sprite Lists
-        self.enemy_list = None
-        self.active_enemies = []
-        self.bullet_list = None
-        self.player = None
-        # Game Objects
-        self.dungeon = None
-        self.prev_keypress = []  # A list that assists with tracking keypress events
-        # Used to keep track of our scrolling
-        self.view_bottom = self.view_left = 0
-        self.Recipe = []
+        # Load every image up front, rather than as rooms and monsters are first made
+        textures.preload(IMAGES)
+
+        self.world = World()
+        # Inputs waiting to be handled by the World's next tick, so they are recorded with it
+        self.inputs = []
+        # The World is stepped at a fixed rate. lag is the time passed that has not been stepped yet
+        self.tick = 1 / Config.TICK_RATE
+        self.lag = 0.0
+        self.fps = None
+        self.hud = HUD()
+        self.fps_label = Label(50, 30, arcade.color.WHITE, 16)
+        # The player's position, drawn above them in the world
+        self.position_label = Label(0, 0, arcade.color.WHITE, 15)
+        # Whether to draw the frame profiler's percentiles
+        self.show_profiler = False
 
         arcade.set_background_color(arcade.color.BLACK)
 
     def setup(self):
         """ Set up the game here. Call this function to restart the game. """
-        # Create the Sprite lists
         self.fps = FPSCounter()
-        self.bullet_list = arcade.SpriteList()
-
-        # Create the dungeon
-        self.dungeon = Dungeon(0, 3)
-
-        # Set up recipes
-        self.Recipe = ActiveRecipe()
-        self.Recipe.set_ghosts()
-
-        # Set up the player, specifically placing it at these coordinates.
-        self.player = Player(self.dungeon)
-        self.player.scale = 1
-        level = random.choice(self.dungeon.levelList)
-        self.player.center_x, self.player.center_y = level.center()
-        self.player.cur_recipe = self.Recipe.active
-        self.player.collisions = arcade.PhysicsEngineSimple(self.player, self.dungeon.getWalls())
-
-        # Set up monsters
-        self.Mobs = MobHandler()
-        self.enemy_list = self.Mobs.setup(Config.MONSTER_COUNT, Config.MONSTER_COUNT, self.player, self.dungeon)
-
-        # Setup viewport
-        self.view_bottom = self.player.center_x - (0.5 * Config.SCREEN_WIDTH) + 300
-        self.view_left = self.player.center_x - (0.5 * Config.SCREEN_WIDTH)
-        arcade.set_viewport(self.view_left,
-                            Config.SCREEN_WIDTH + self.view_left,
-                            self.view_bottom,
-                            Config.SCREEN_HEIGHT + self.view_bottom)
+        self.inputs.clear()
+        self.lag = 0.0
+        self.world.setup()
+        self.update_viewport()
+
+    def update_viewport(self) -> None:
+        """
+        Shows the World's viewport on screen.
+        """
+        arcade.set_viewport(*self.world.viewport)
 
     def on_draw(self):
         """ Render the screen. """
+        world = self.world
+        profiler = world.profiler
         try:
+            # Draw everything part way through it's move during the last tick, by the time passed since then
+            world.interpolate(self.lag / self.tick)
+            if world.viewport != tuple(arcade.get_viewport()):
+                self.update_viewport()
+
             # Clear the screen to the background color
             arcade.start_render()
 
             # Draw our sprites
-            self.dungeon.render()
-            self.Mobs.render()
-            #self.active_enemies.draw()
-            self.bullet_list.draw()
-            self.Recipe.render()
+            with profiler.phase('dungeon_render'):
+                world.dungeon.render(world.viewport)
+            with profiler.phase('mob_render'):
+                world.Mobs.render(world.viewport)
+                #self.active_enemies.draw()
+            with profiler.phase('bullets'):
+                world.bullets.draw(world.viewport)
 
             # Draw stats
-            arcade.draw_text("Health:"+str(self.player.health)+"/"+str(self.player.max_health), self.view_left+100, self.view_bottom+60, arcade.color.RED, 15, font_name='Arial')
-            arcade.draw_text("Armor:"+str(self.player.armor), self.view_left+100, self.view_bottom+90, arcade.color.BLUE, 15, font_name='Arial')
-            arcade.draw_text("Speed:"+str(self.player.speed), self.view_left+100, self.view_bottom+120, arcade.color.YELLOW, 15, font_name='Arial')
+            player = world.player
+            with profiler.phase('hud'):
+                world.Recipe.render()
+                self.hud.update(player)
+                self.hud.draw()
+
+            if self.show_profiler:
+                profiler.draw(20, Config.SCREEN_HEIGHT - 150)
             
             if Config.DEBUG:
-                x, y = self.player.position
+                x, y = player.position
                 arcade.draw_rectangle_outline(round(x / Config.TILE_SIZE) * Config.TILE_SIZE,
                                               round(y / Config.TILE_SIZE) * Config.TILE_SIZE,
                                               Config.TILE_SIZE, Config.TILE_SIZE, arcade.color.RED)
-                self.player.draw_hit_box()
-                arcade.draw_text(str((x, y)), x - 40, y + 50, arcade.color.WHITE, 15, font_name='Arial')
-                arcade.draw_text(f"FPS: {self.fps.get_fps():3.0f}", self.view_left + 50, self.view_bottom + 30,
-                                arcade.color.WHITE, 16, font_name='Arial')
+                player.draw_hit_box()
+                self.position_label.set_text(str((x, y)))
+                self.position_label.place(x - 40, y + 50)
+                self.position_label.draw()
+                self.fps_label.set_text(f"FPS: {self.fps.get_fps():3.0f}")
+                with screen_space():
+                    self.fps_label.draw()
 
                 # Draw paths for all mobs
-                for mob in self.active_enemies:
+                for mob in world.active_enemies:
                     if mob.target is not None:
                         t1 = time.time()
                         path = mob.get_path()
@@ -135,6 +135,7 @@ class Game(arcade.Window):
         except Exception:
             import traceback
             traceback.print_exc()
+        profiler.end_frame()
 
     @staticmethod
     def draw_path(path: List[Tuple[int, int]]) -> None:
@@ -152,153 +153,44 @@ class Game(arcade.Window):
     def on_key_press(self, key, modifiers):
         """Called whenever a key is pressed. """
 
-        if key == arcade.key.UP or key == arcade.key.W:
-            self.player.change_y = self.player.speed
-            self.prev_keypress.append(key)
-        elif key == arcade.key.DOWN or key == arcade.key.S:
-            self.player.change_y = -self.player.speed
-            self.prev_keypress.append(key)
-        elif key == arcade.key.LEFT or key == arcade.key.A:
-            self.player.change_x = -self.player.speed
-            self.prev_keypress.append(key)
-        elif key == arcade.key.RIGHT or key == arcade.key.D:
-            self.player.change_x = self.player.speed
-            self.prev_keypress.append(key)
-        elif key == 65307:
+        if key == arcade.key.ESCAPE:
             self.close()
-        elif key == 65505:
-            self.Recipe.next_recipe()
-            self.player.cur_recipe = self.Recipe.active
+        elif key == arcade.key.F3:
+            self.show_profiler = not self.show_profiler
+        elif key == arcade.key.F4:
+            # Dump the recent frames' phase times for offline analysis
+            self.world.profiler.write_csv('profile.csv')
+        elif key == arcade.key.F5:
+            # Save the inputs so far, to replay this run headlessly
+            self.world.recording.save(Config.REPLAY_FILE)
+        else:
+            self.inputs.append(('press', key))
 
     def on_key_release(self, key, modifiers):
         """Called when the user releases a key. """
-
-        if key == arcade.key.UP or key == arcade.key.W:
-            self.player.change_y = 0
-            self.prev_keypress.remove(key)
-        elif key == arcade.key.DOWN or key == arcade.key.S:
-            self.player.change_y = 0
-            self.prev_keypress.remove(key)
-        elif key == arcade.key.LEFT or key == arcade.key.A:
-            self.player.change_x = 0
-            self.prev_keypress.remove(key)
-        elif key == arcade.key.RIGHT or key == arcade.key.D:
-            self.player.change_x = 0
-            self.prev_keypress.remove(key)
-
-        if self.prev_keypress:
-            self.on_key_press(self.prev_keypress.pop(0), 0)
+        self.inputs.append(('release', key))
 
     def on_mouse_press(self, x, y, button, modifiers):
         """
         Called whenever the mouse is clicked.
         """
+        self.inputs.append(('click', x + self.world.view_left, y + self.world.view_bottom))
 
-        # Create a bullet TEMP SPRITE, currently wielding frog slingshot
-        bullet = Temp()
-        # Position the bullet at the player's current location
-        start_x = self.player.center_x
-        start_y = self.player.center_y
-        bullet.center_x = start_x
-        bullet.center_y = start_y
-
-        # Get from the mouse the destination location for the bullet
-        dest_x = x + self.view_left
-        dest_y = y + self.view_bottom
-
-        # Do math to calculate how to get the bullet to the destination.
-        # Calculation the angle in radians between the start points
-        # and end points. This is the angle the bullet will travel.
-        x_diff = dest_x - start_x
-        y_diff = dest_y - start_y
-        angle = math.atan2(y_diff, x_diff)
-
-        # Angle the bullet sprite so it doesn't look like it is flying sideways.
-        bullet.angle = math.degrees(angle)
-
-        # Taking into account the angle, calculate our change_x
-        # and change_y. Velocity is how fast the bullet travels.
-        bullet.change_x = math.cos(angle) * bullet.speed
-        bullet.change_y = math.sin(angle) * bullet.speed
+    def on_update(self, delta_time):
+        """
+        Movement and game logic. Steps the World once for every tick that has passed, up to Config.MAX_SUBSTEPS.
+        """
 
-        # Add the bullet to the appropriate lists
-        self.bullet_list.append(bullet)
+        self.lag += delta_time
+        steps = 0
+        while self.lag >= self.tick and steps < Config.MAX_SUBSTEPS:
+            inputs, self.inputs = self.inputs, []
+            self.world.step(self.tick, inputs)
+            self.lag -= self.tick
+            steps += 1
+        # Drop the time that could not be caught up on, rather than falling further behind every frame
+        self.lag = min(self.lag, self.tick)
 
-    def on_update(self, delta_time):
-        """ Movement and game logic """
-        if self.player.health == 0:
-        	self.setup()
-        if len(self.enemy_list) == 0 and len(self.active_enemies)==0:
-        	self.setup()
-
-        # Update Mobs
-        self.Mobs.update()
-
-        # scroll screen
-        self.scroll_screen()
-
-        # Projectile updates
-        self.bullet_list.update()
-        for bullet in self.bullet_list:
-
-            # Collision Checks
-            hit_list = arcade.check_for_collision_with_list(bullet, self.dungeon.getWalls())
-            enemy_hit_list = arcade.check_for_collision_with_list(bullet, self.enemy_list)
-            # If it did, get rid of the bullet
-            if len(hit_list) > 0:
-                bullet.remove_from_sprite_lists()
-            if len(enemy_hit_list):
-                boon = self.Recipe.add_kill(enemy_hit_list[0].monster_type)
-                if boon >= 0:
-                    getattr(self.player, Config.BOON_LIST[boon])();
-                enemy_hit_list[0].remove_from_sprite_lists()
-                bullet.remove_from_sprite_lists()
-
-            # If the bullet flies off-screen, remove it. TEMP change to range calc
-            if (
-                    bullet.bottom < self.view_bottom or
-                    bullet.top > self.view_bottom + Config.SCREEN_HEIGHT or
-                    bullet.right > self.view_left + Config.SCREEN_WIDTH or
-                    bullet.left < self.view_left
-            ):
-                bullet.remove_from_sprite_lists()
-
-    def scroll_screen(self):
-        # Below manages all scrolling mechanics
-
-        changed = False  # Track if we need to change the viewport
-        # Scroll left
-        left_boundary = self.view_left + Config.LEFT_VIEWPORT_MARGIN
-        if self.player.left < left_boundary:
-            self.view_left -= left_boundary - self.player.left
-            changed = True
-        # Scroll right
-        right_boundary = self.view_left + Config.SCREEN_WIDTH - Config.RIGHT_VIEWPORT_MARGIN
-        if self.player.right > right_boundary:
-            self.view_left += self.player.right - right_boundary
-            changed = True
-        # Scroll up
-        top_boundary = self.view_bottom + Config.SCREEN_HEIGHT - Config.TOP_VIEWPORT_MARGIN
-        if self.player.top > top_boundary:
-            self.view_bottom += self.player.top - top_boundary
-            changed = True
-        # Scroll down
-        bottom_boundary = self.view_bottom + Config.BOTTOM_VIEWPORT_MARGIN
-        if self.player.bottom < bottom_boundary:
-            self.view_bottom -= bottom_boundary - self.player.bottom
-            changed = True
-
-        if changed:
-            # Only scroll to integers. Otherwise we end up with pixels that
-            # don't line up on the screen
-            self.view_bottom = int(self.view_bottom)
-            self.view_left = int(self.view_left)
-
-            # Do the scrolling
-            arcade.set_viewport(self.view_left,
-                                Config.SCREEN_WIDTH + self.view_left,
-                                self.view_bottom,
-                                Config.SCREEN_HEIGHT + self.view_bottom)
 
 def main() -> None:
     """
@@ -7,16 +7,20 @@ Pathfinding will also depend on objects here, and is thus integral to it's funct
 from __future__ import annotations
 
 import json
-from pprint import pprint
+import math
 
 import arcade
+import numpy as np
 import random
 
+from collections import OrderedDict
+from concurrent.futures import Future
 from itertools import chain
+from typing import List, Optional, Tuple
 from config import Config
-from pathfinding.core.diagonal_movement import DiagonalMovement
-from pathfinding.core.grid import Grid
-from pathfinding.finder.a_star import AStarFinder
+from path import NEIGHBOURS, SEARCHES, DistanceTransform, PathService
+from spatial import tile_lookup
+from sprites import textures
 
 
 class Dungeon(object):
@@ -24,16 +28,21 @@ class Dungeon(object):
     Organizes Level objects into an easy to render and path through object.
     """
 
-    def __init__(self, level_count: int = 3, size: int = 3) -> None:
+    def __init__(self, level_count: int = 3, size: int = 3, rng: random.Random = None,
+                 workers: int = Config.PATH_WORKERS) -> None:
         """
         Initializes the Dungeon object.
 
         :param level_count: The number of Active Levels that should be stored within the Dungeon.
         :param size: The diameter of the dungeon. Allows for a total of size^2 slots for levels.
+        :param rng: Picks the layout of each Level, and random spots in them. Defaults to the random module.
+        :param workers: Background workers used to search for paths, 0 searches on the main thread instead.
         """
 
         self.level_count = level_count
         self.size = size
+        self.rng = rng or random
+        self.workers = workers
 
         self.floor_list = arcade.SpriteList(is_static=True)
         self.wall_list = arcade.SpriteList(is_static=True)
@@ -43,20 +52,91 @@ class Dungeon(object):
 
         center = "resources/levels/map1/center.json"
         self.levels = [
-            [Level.load_file(x, y) for y in range(size)] for x in range(size)
+            [Level.load_file(x, y, rng=self.rng) for y in range(size)] for x in range(size)
         ]
         print('--------------------------------------------------')
         print(self.levels)
-        self.matrix = [[1 for yy in range(size * 10)] for xx in range(10 * size)]
-        for column in self.levels:
-            for level in column:
-                for xx in range(10):
-                    for yy in range(10):
-                        if level.structure[xx][yy] == 'w':
-                            self.matrix[(level.x * 10) + xx][(level.y * 10) + yy] = 0
-        self.grid = Grid(matrix=self.matrix)
-        self.finder = AStarFinder(diagonal_movement=DiagonalMovement.always)
-        pprint(self.matrix, width=1000)
+
+        # Every Level's tiles in two static batches, so the Dungeon is drawn in two calls however large it is
+        for level in self.levelList:
+            self.floor_list.extend(level.floorSprites)
+            self.wall_list.extend(level.wallSprites)
+
+        # The walkability of every tile in the dungeon, indexed [x, y]. 0s are walls, 1s are walkable.
+        self.walkable = np.block([[level.walkable for level in column] for column in self.levels]).astype(np.uint8)
+        self.search = SEARCHES[Config.PATH_FINDER](self.walkable)
+        self.flow_field = FlowField(self.walkable, Config.FLOW_FIELD_RADIUS)
+        self.path_cache = PathCache(Config.PATH_CACHE_SIZE)
+        # Background searches, started on the first request
+        self.path_service = None
+        self.pending_paths = {}
+        self.wall_index = WallIndex(self.walkable, self.levelList)
+
+    def find_path(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a path between two dungeon tiles, reusing a cached one if the same search was done recently.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A list of tile positions from start to end, or an empty list if there is no path.
+                 Depending on Config.PATH_FINDER, only the start of the path may be refined into single steps.
+        """
+
+        path = self.path_cache.get(start, end)
+        if path is None:
+            path = self.search(start, end)
+            self.path_cache.put(start, end, path)
+        return path
+
+    def request_path(self, start: Tuple[int, int], end: Tuple[int, int]) -> Future:
+        """
+        Asks for a path between two dungeon tiles without waiting for the search.
+        Searches run on the background PathService, or right away if the Dungeon has no workers.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A Future holding the path, in the same format find_path returns.
+        """
+
+        key = (start, end)
+        if key in self.pending_paths:
+            return self.pending_paths[key]
+
+        path = self.path_cache.get(start, end)
+        if path is None and self.workers > 0:
+            if self.path_service is None:
+                self.path_service = PathService(self.walkable, self.workers, Config.PATH_WORKER_PROCESSES,
+                                                Config.PATH_FINDER)
+            self.pending_paths[key] = self.path_service.submit(start, end)
+            return self.pending_paths[key]
+
+        if path is None:
+            path = self.search(start, end)
+            self.path_cache.put(start, end, path)
+        future = Future()
+        future.set_result(path)
+        return future
+
+    def collect_paths(self) -> None:
+        """
+        Moves finished background searches into the path cache. Should be called once per frame.
+        """
+
+        for key, future in list(self.pending_paths.items()):
+            if future.done():
+                del self.pending_paths[key]
+                if future.exception() is None:
+                    self.path_cache.put(*key, future.result())
+
+    def close(self) -> None:
+        """
+        Stops any background pathfinding workers.
+        """
+
+        if self.path_service is not None:
+            self.path_service.shutdown()
+            self.path_service = None
+        self.pending_paths.clear()
 
     def getWalls(self) -> arcade.SpriteList:
         """
@@ -65,26 +145,37 @@ class Dungeon(object):
 
         :return: A SpriteList containing all Wall (Collidable) Sprites.
         """
+        return self.wall_list
 
-        walls = arcade.SpriteList(is_static=True)
-        walls.extend(
-            list(chain.from_iterable(
-                chain.from_iterable([level.wallSprites for level in column if level is not None]) for column in
-                self.levels
-            ))
-        )
-        return walls
+    def render(self, viewport: Tuple[float, float, float, float] = None) -> None:
+        """
+        Draws the Levels on screen, or every Level's floors and then every Level's walls if there is no viewport.
 
-    def render(self) -> None:
+        :param viewport: The left, right, bottom and top edges of the area on screen.
         """
-        Calls render on all level
+
+        if viewport is None:
+            self.floor_list.draw()
+            self.wall_list.draw()
+        else:
+            for level in self.visible_levels(viewport):
+                level.tiles.draw()
+
+    def visible_levels(self, viewport: Tuple[float, float, float, float]) -> List[Level]:
         """
+        Finds the Levels on screen by where the viewport falls in the grid of Levels, without looking at the others.
 
-        for column in self.levels:
-            for level in column:
-                if level is not None:
-                    level.floorSprites.draw()
-                    level.wallSprites.draw()
+        :param viewport: The left, right, bottom and top edges of the area on screen.
+        :return: Every Level whose tiles are at least partly on screen.
+        """
+
+        left, right, bottom, top = viewport
+        # Tiles are centered on the edges of their Level's grid, so each Level's tiles start half a tile before it
+        half = Config.TILE_SIZE / 2
+        x1, x2, y1, y2 = (math.floor((edge + half) / Config.LEVEL_SIZE) for edge in (left, right, bottom, top))
+        columns = range(max(x1, 0), min(x2, self.size - 1) + 1)
+        rows = range(max(y1, 0), min(y2, self.size - 1) + 1)
+        return [self.levels[x][y] for x in columns for y in rows if self.levels[x][y] is not None]
 
     @property
     def levelList(self) -> list:
@@ -98,6 +189,215 @@ class Dungeon(object):
         ))
 
 
+class WallIndex(object):
+    """
+    A spatial index of the Dungeon's wall tiles, using the tile grid itself as a uniform grid of buckets.
+    Queries only look at the tiles under the area asked about, so they cost the same however many walls there are.
+    """
+
+    def __init__(self, walkable: np.ndarray, levels: List[Level]) -> None:
+        """
+        Indexes every wall Sprite by the tile it sits on.
+
+        :param walkable: The Dungeon walkability array, indexed [x, y]. 0s are walls.
+        :param levels: The Levels holding the wall Sprites.
+        """
+
+        self.walls = np.asarray(walkable) == 0
+        self.sprites = {}
+        # How far a wall Sprite reaches from the center of it's tile
+        self.reach = Config.TILE_SIZE / 2
+        for level in levels:
+            for sprite in level.wallSprites:
+                tile = round(sprite.center_x / Config.TILE_SIZE), round(sprite.center_y / Config.TILE_SIZE)
+                self.sprites[tile] = sprite
+                self.reach = max(self.reach, sprite.right - sprite.center_x, sprite.center_x - sprite.left,
+                                 sprite.top - sprite.center_y, sprite.center_y - sprite.bottom)
+
+    def tiles(self, left: float, bottom: float, right: float, top: float) -> Tuple[slice, slice]:
+        """
+        :return: Slices over the tiles whose walls could overlap a box, clipped to the Dungeon.
+        """
+
+        width, height = self.walls.shape
+        x1 = min(max(math.ceil((left - self.reach) / Config.TILE_SIZE), 0), width)
+        x2 = min(max(math.floor((right + self.reach) / Config.TILE_SIZE) + 1, 0), width)
+        y1 = min(max(math.ceil((bottom - self.reach) / Config.TILE_SIZE), 0), height)
+        y2 = min(max(math.floor((top + self.reach) / Config.TILE_SIZE) + 1, 0), height)
+        return slice(x1, x2), slice(y1, y2)
+
+    def overlaps_box(self, left: float, bottom: float, right: float, top: float) -> bool:
+        """
+        :return: True if any wall tile could overlap the box.
+        """
+        return bool(self.walls[self.tiles(left, bottom, right, top)].any())
+
+    def overlaps_point(self, x: float, y: float) -> bool:
+        """
+        :return: True if the point lies inside a wall Sprite's hit box.
+        """
+        return any(wall.collides_with_point((x, y)) for wall in self.query_box(x, y, x, y))
+
+    def query_box(self, left: float, bottom: float, right: float, top: float) -> List[arcade.Sprite]:
+        """
+        :return: The wall Sprites that could overlap the box.
+        """
+
+        xs, ys = self.tiles(left, bottom, right, top)
+        return [self.sprites[(xs.start + x, ys.start + y)] for x, y in np.argwhere(self.walls[xs, ys])]
+
+    def collisions(self, sprite: arcade.Sprite) -> List[arcade.Sprite]:
+        """
+        Checks a Sprite's hit box against the walls near it.
+
+        :return: The wall Sprites the Sprite is touching.
+        """
+
+        candidates = self.query_box(sprite.left, sprite.bottom, sprite.right, sprite.top)
+        return [wall for wall in candidates if arcade.check_for_collision(sprite, wall)]
+
+
+class PathCache(object):
+    """
+    A least recently used cache of paths, keyed by their start and goal tiles.
+    Paths handed out are shared, and must not be modified.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        """
+        Initializes an empty PathCache.
+
+        :param capacity: The number of paths kept before the least recently used ones are evicted.
+        """
+
+        self.capacity = capacity
+        self.paths = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, start: Tuple[int, int], end: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+        """
+        :return: The cached path between the two tiles, or None if it is not cached.
+        """
+
+        path = self.paths.get((start, end))
+        if path is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.paths.move_to_end((start, end))
+        return path
+
+    def put(self, start: Tuple[int, int], end: Tuple[int, int], path: List[Tuple[int, int]]) -> None:
+        """
+        Stores a path, evicting the least recently used paths if the cache is full.
+        """
+
+        self.paths[(start, end)] = path
+        self.paths.move_to_end((start, end))
+        while len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Forgets every cached path. Must be called if the walls of the Dungeon change.
+        """
+        self.paths.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: The fraction of lookups that were answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class FlowField(object):
+    """
+    A distance map over the Dungeon, pointing towards a single goal tile.
+    Enemies chasing the same target share one FlowField and read their next step from it,
+    so the distances are only computed again once the goal moves onto another tile.
+    The distances can be limited to a square window around the goal, so their cost does not grow with the Dungeon.
+    """
+
+    def __init__(self, walkable: np.ndarray, radius: int = None) -> None:
+        """
+        Initializes the FlowField. No distances are computed until a goal is given.
+
+        :param walkable: The Dungeon walkability array, indexed [x, y]. 0s are walls, 1s are walkable.
+        :param radius: How many tiles from the goal the distances reach. None covers the whole Dungeon.
+        """
+
+        self.walkable = np.asarray(walkable, dtype=np.uint8)
+        self.radius = radius
+        self.transform = DistanceTransform(self.walkable)
+        self.goal = None
+        self.distances = np.full(self.transform.shape, np.inf)
+        self.steps = np.full(self.transform.shape, -1, dtype=np.int8)
+        # The change in tile for each NEIGHBOURS index, with no change last so a step of -1 stays put
+        self.offsets = np.array([(dx, dy) for dx, dy, cost in NEIGHBOURS] + [(0, 0)])
+
+    def update(self, goal: Tuple[int, int]) -> bool:
+        """
+        Points the FlowField towards a new goal tile. Does nothing if the goal has not changed.
+
+        :param goal: The goal tile position.
+        :return: True if the distances were recomputed.
+        """
+
+        if goal == self.goal:
+            return False
+        self.goal = goal
+        if self.radius is None:
+            self.distances = self.transform.distances(goal)
+            self.steps = self.transform.descent(self.distances)
+            return True
+
+        # Paths are only searched for within the window, tiles outside of it cannot reach the goal
+        (width, height), (x, y) = self.transform.shape, goal
+        x1, y1 = max(0, x - self.radius), max(0, y - self.radius)
+        window = slice(x1, min(width, x + self.radius + 1)), slice(y1, min(height, y + self.radius + 1))
+        transform = DistanceTransform(self.walkable[window])
+        distances = transform.distances((x - x1, y - y1))
+        self.distances = np.full(self.transform.shape, np.inf)
+        self.steps = np.full(self.transform.shape, -1, dtype=np.int8)
+        self.distances[window] = distances
+        self.steps[window] = transform.descent(distances)
+        return True
+
+    def distance(self, position: Tuple[int, int]) -> float:
+        """
+        :param position: A tile position.
+        :return: The path distance from the tile to the goal, or infinity if it cannot be reached.
+        """
+        return self.distances[position] if self.transform.inside(position) else math.inf
+
+    def next_step(self, position: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """
+        Returns the neighbouring tile that leads towards the goal the fastest.
+
+        :param position: The tile position to step from.
+        :return: The next tile position, or None if already at the goal or the goal cannot be reached.
+        """
+
+        if not self.transform.inside(position) or self.steps[position] < 0:
+            return None
+        dx, dy, _ = NEIGHBOURS[self.steps[position]]
+        return position[0] + dx, position[1] + dy
+
+    def directions(self, tiles: np.ndarray) -> np.ndarray:
+        """
+        Looks up the next step from many tiles at once.
+
+        :param tiles: Tile positions, shaped (n, 2).
+        :return: The change in tile towards the goal from each tile, shaped (n, 2).
+                 (0, 0) at the goal, outside the Dungeon, or where the goal cannot be reached.
+        """
+
+        return self.offsets[tile_lookup(self.steps, tiles[:, 0], tiles[:, 1], -1)]
+
+
 class Level:
     """
     A 10x10 space holding wall and background sprites, enemies, items and so forth.
@@ -105,20 +405,24 @@ class Level:
 
     """
 
-    def __init__(self, level_x: int = 0, level_y: int = 0) -> None:
+    def __init__(self, level_x: int = 0, level_y: int = 0, rng: random.Random = None) -> None:
         """
         Initializes the level class. Defaults with no sprites, and no background.
 
         :param level_x: The level's X position within the Dungeon level matrix.
         :param level_y: The level's Y position within the Dungeon level matrix.
+        :param rng: Picks random spots in the level. Defaults to the random module.
         """
 
         self.x, self.y = level_x, level_y
+        self.rng = rng or random
         self.sprites = []
         self.structure = []
 
         self.floorSprites = arcade.SpriteList(is_static=True)
         self.wallSprites = arcade.SpriteList(is_static=True)
+        # Every floor and wall tile in one static batch, to draw the Level alone
+        self.tiles = arcade.SpriteList(is_static=True)
 
         # Tuples containing the Node positions of where walls, floor and entrances are.
         # All positions are generated based on the level's X and Y position, so that all points within
@@ -127,19 +431,22 @@ class Level:
         self.wall_list = []
 
     @staticmethod
-    def load_file(level_x: int, level_y: int) -> Level:
+    def load_file(level_x: int, level_y: int, path: str = None, rng: random.Random = None) -> Level:
         """
         Builds a Level from a given file path.
 
         :param level_x: The level's X position within the Dungeon level matrix.
         :param level_y: The level's Y position within the Dungeon level matrix.
-        :param path: Path to the Level file.
+        :param path: Path to the Level file. Picks one of the map1 levels at random by default.
+        :param rng: Picks the Level file, and random spots in the Level. Defaults to the random module.
         :return: The new generated Level file.
         """
 
-        path = f'resources/levels/map1/{random.randint(1, 9)}.json'
+        rng = rng or random
+        if path is None:
+            path = f'resources/levels/map1/{rng.randint(1, 9)}.json'
 
-        level = Level(level_x, level_y)
+        level = Level(level_x, level_y, rng)
         with open(path) as file:
             data = json.load(file)
             # Loads elements and structure data from level file
@@ -152,7 +459,7 @@ class Level:
         for x in range(0, 10):
             for y in range(0, 10):
                 tilePath = level.sprites[level.structure[x][y]]
-                sprite = arcade.Sprite(tilePath, Config.TILE_SCALING)
+                sprite = textures.sprite(tilePath, Config.TILE_SCALING)
                 sprite.center_x, sprite.center_y = x * tile_scale, y * tile_scale
 
                 if 'floor' in tilePath:
@@ -163,6 +470,8 @@ class Level:
         # Move everything into correct positions
         level.floorSprites.move(*level.bottomLeft())
         level.wallSprites.move(*level.bottomLeft())
+        level.tiles.extend(level.floorSprites)
+        level.tiles.extend(level.wallSprites)
 
         return level
 
@@ -181,10 +490,19 @@ class Level:
         """
         return int((self.x + 0.5) * Config.LEVEL_SIZE), int((self.y + 0.5) * Config.LEVEL_SIZE)
 
+    @property
+    def walkable(self) -> np.ndarray:
+        """
+        :return: A 10x10 array of the level's structure, indexed [x, y]. 0s are walls, 1s are walkable.
+        """
+        return (np.array(self.structure) != 'w').astype(np.uint8)
+
     def random(self) -> tuple:
         """
         Returns a random spot in the level.
         :return: A tuple containing the X and Y coordinates
         """
 
-        return int((self.x + random.randint(1,9)/10) * Config.LEVEL_SIZE), int((self.y + random.randint(1,9)/10) * Config.LEVEL_SIZE)
+        x = int((self.x + self.rng.randint(1, 9) / 10) * Config.LEVEL_SIZE)
+        y = int((self.y + self.rng.randint(1, 9) / 10) * Config.LEVEL_SIZE)
+        return x, y
@@ -3,108 +3,256 @@ mobs.py
 Organizes all classes related to Mobs, Entities, Enemies, Players and Items.
 """
 
-from typing import List, Tuple
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
 
 import arcade
+import numpy as np
 import random
 import math
+import time
 
 from config import Config, Enums, SpritePaths
-from map import Dungeon
-from sprites import PlayerAnimations
+from map import Dungeon, WallIndex
+from profiler import FrameProfiler
+from spatial import ViewList, box_overlaps, in_view, tile_lookup, tiles_at
+from sprites import PlayerAnimations, textures
 
 class MobHandler:
 
-    def __init__(self):
+    def __init__(self, profiler: FrameProfiler = None, rng: random.Random = None,
+                 budget: Optional[float] = Config.PATHFINDING_BUDGET_MS):
         super().__init__()
+        # Times the mobs, physics and pathfinding phases of each frame
+        self.profiler = profiler or FrameProfiler()
+        # Picks where enemies spawn and wander to, seeded so runs can be repeated
+        self.rng = rng or random.Random()
+        self.wander_rng = np.random.RandomState(self.rng.randrange(2 ** 32))
         self.enemy_list = []
-        self.avoid_list = []
         self.dungeon = None
         self.player = None
+        self.physics = None
+        self.store = MobStore()
+        self.scheduler = AIScheduler(budget)
+        # Counts updates, so enemies in the reduced tier can take turns
+        self.frame = 0
+        # The left, right, bottom and top edges of the area on screen, None for arcade's current viewport
+        self.viewport = None
+        # The enemies on screen, to draw
+        self.visible = ViewList()
 
     def setup(self, ghost, frogs, player, dungeon) -> list:
         self.enemy_list = arcade.SpriteList()
+        self.visible = ViewList()
+        self.scheduler.clear()
         self.dungeon = dungeon
         self.player = player
-        self.avoid_list = arcade.SpriteList()
-        self.avoid_list.append(self.player)
-        for d in dungeon.getWalls():
-            self.avoid_list.append(d)
+        self.physics = MobPhysics(self.dungeon.walkable)
+        self.store = MobStore()
 
         for count in range(ghost):
-            mob = Enemy(filename="resources/images/monsters/ghost/ghost1.png", dungeon=self.dungeon)
-            level = random.choice(self.dungeon.levelList)
-            mob.center_x, mob.center_y = level.random()
+            mob = Enemy(dungeon=self.dungeon)
+            mob.texture = textures.get(SpritePaths.GHOST)
+            level = self.rng.choice(self.dungeon.levelList)
+            mob.center_x, mob.center_y = self.spawn(level)
             mob.target = self.player
             mob.scale = 4
-            mob.monster_type = 'ghost'
-            mob.collisions = arcade.PhysicsEngineSimple(mob, self.avoid_list)
             mob.level = level
+            self.store.add(mob, 'ghost')
             self.enemy_list.append(mob)
-            self.avoid_list.append(mob)
         for count in range(frogs):
-            mob = Enemy(filename="resources/images/monsters/frog/frog1.png", dungeon=self.dungeon)
-            level = random.choice(self.dungeon.levelList)
-            mob.center_x, mob.center_y = level.random()
+            mob = Enemy(dungeon=self.dungeon)
+            mob.texture = textures.get(SpritePaths.FROG)
+            level = self.rng.choice(self.dungeon.levelList)
+            mob.center_x, mob.center_y = self.spawn(level)
             mob.target = self.player
             mob.scale = 4
-            mob.monster_type = 'frog'
-            mob.collisions = arcade.PhysicsEngineSimple(mob, self.avoid_list)
             mob.level = level
+            self.store.add(mob, 'frog')
             self.enemy_list.append(mob)
-            self.avoid_list.append(mob)
 
         return self.enemy_list
 
-    def render(self) -> None:
+    def spawn(self, level) -> Tuple[int, int]:
+        """
+        Picks a random spot in a Level to place a Mob, that is not inside of a wall.
+
+        :param level: The Level to place the Mob in.
+        :return: The pixel position to place the Mob at.
+        """
+
+        while True:
+            x, y = level.random()
+            if self.dungeon.walkable[round(x / Config.TILE_SIZE), round(y / Config.TILE_SIZE)]:
+                return x, y
+
+    def kill(self, enemy: Enemy) -> None:
+        """
+        Removes an Enemy from the game.
+        """
+
+        self.store.remove(enemy)
+        enemy.remove_from_sprite_lists()
+
+    def render(self, viewport: Tuple[float, float, float, float] = None) -> None:
+        """
+        Draws the player and the enemies on screen, or every enemy if there is no viewport.
+
+        :param viewport: The left, right, bottom and top edges of the area on screen.
+        """
+
         self.player.draw()
-        self.enemy_list.draw()
+        if viewport is None:
+            self.enemy_list.draw()
+            return
+        # Where each enemy's Sprite was last drawn, which may be between ticks
+        edges = np.tile(self.store.drawn, 2) + self.store.bounds
+        self.visible.update(self.store.sprites, in_view(edges, viewport))
+        self.visible.draw()
+
+    def update(self, viewport: Tuple[float, float, float, float] = None) -> None:
+        """
+        Moves the player and every enemy, and runs the enemies' AI.
+
+        :param viewport: The left, right, bottom and top edges of the area on screen. Defaults to arcade's viewport.
+        """
 
-    def update(self) -> None:
+        self.viewport = viewport
+        profiler = self.profiler
         #update player
-        self.player.collisions.update()
-        self.player.update_animation()
+        with profiler.phase('physics'):
+            self.player.collisions.update()
+            # Move every enemy at once, using the velocities they chose last frame
+            self.move_enemies()
+        with profiler.phase('mobs'):
+            self.player.update_animation()
+
+        # Pick up paths that finished searching in the background
+        with profiler.phase('pathfinding'):
+            self.dungeon.collect_paths()
 
         # Enemy activation and update
-        for enemy in reversed(self.enemy_list):
-            distance = self.get_distance(enemy)
-            enemy.collisions.update()
-            if distance < 100 :
-                self.player.health -= (2 - self.player.armor)
-            if (distance < 300):
-                enemy.speed = Config.MONSTER_MOVEMENT_SPEED
-                try:
-                    path = enemy.get_path(enemy.target.position)
-                    enemy.tick(path)
-                except Exception:
-                    import traceback
-                    traceback.print_exc()
-            else:
-                left, right, bottom, top = arcade.get_viewport()
-                if (
-                    enemy.bottom > bottom and
-                    enemy.top < bottom + Config.SCREEN_HEIGHT and
-                    enemy.right < left + Config.SCREEN_WIDTH and
-                    enemy.left > left
-                    ):
-                        enemy.speed = 5
-                        ran = random.randint(0,1000)
-                        if ran > 950:
-                            print(ran)
-                            try:
-                                path = enemy.get_path(enemy.level.random())
-                                enemy.tick(path)
-                            except Exception:
-                                import traceback
-                                traceback.print_exc()
-
-    def get_distance(self, enemy) -> int:
-        start_x = enemy.center_x
-        start_y = enemy.center_y
-        end_x = self.player.center_x
-        end_y = self.player.center_y
-        distance = math.sqrt(math.pow(start_x - end_x, 2) + math.pow(start_y - end_y, 2))
-        return distance
+        with profiler.phase('mobs'):
+            if len(self.store):
+                self.activate()
+
+        # Searches for new paths, as many as fit within this frame's budget
+        with profiler.phase('pathfinding'):
+            self.scheduler.run()
+
+    def tiers(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Sorts every enemy into an AI level of detail tier, by it's distance from the player and whether it is on screen.
+
+        :param distances: Every enemy's distance from the player.
+        :return: Each enemy's tier, one of MobStore.FULL, REDUCED, STEER or DORMANT.
+        """
+        return np.select([distances < Config.AI_FULL_RADIUS, distances < Config.AI_REDUCED_RADIUS, self.on_screen()],
+                         [MobStore.FULL, MobStore.REDUCED, MobStore.STEER], MobStore.DORMANT).astype(np.int8)
+
+    def activate(self) -> None:
+        """
+        Works out which enemies are touching the player and which AI tier they are in for every enemy at once,
+        then only does AI work for the enemies that need it this frame. Dormant enemies cost nothing here.
+        """
+
+        store = self.store
+        self.frame += 1
+        distances = store.distances(self.player.position)
+        store.tiers[:] = tiers = self.tiers(distances)
+        contact = distances < 100
+        # Reduced tier enemies are spread over their interval, so each frame only a share of them is updated
+        due = (np.arange(len(store)) + self.frame) % Config.AI_REDUCED_INTERVAL == 0
+        chasing = (tiers == MobStore.FULL) | ((tiers == MobStore.REDUCED) & due)
+        wandering = tiers == MobStore.STEER
+        dormant = tiers == MobStore.DORMANT
+
+        self.player.health -= np.count_nonzero(contact) * (2 - self.player.armor)
+        store.speeds[tiers <= MobStore.REDUCED] = Config.MONSTER_MOVEMENT_SPEED
+        store.speeds[wandering] = 5
+        store.velocities[dormant] = 0
+        store.states[dormant] = MobStore.IDLE
+        store.states[wandering] = MobStore.WANDER
+        store.states[tiers <= MobStore.REDUCED] = MobStore.CHASE
+
+        # Only enemies with a search in flight have a path to pick up, dormant ones wait until they wake up
+        for index in np.flatnonzero(store.pending & ~dormant).tolist():
+            enemy = store.sprites[index]
+            if enemy.collect_path():
+                enemy.tick(enemy.remaining_path())
+
+        if chasing.any():
+            self.chase(np.flatnonzero(chasing), distances)
+
+        # Only a few wandering enemies pick a new spot to walk to each frame
+        wanderers = wandering & (self.wander_rng.random_sample(len(store)) < Config.AI_WANDER_CHANCE)
+        for index in np.flatnonzero(wanderers).tolist():
+            enemy = store.sprites[index]
+            self.scheduler.request(enemy, enemy.level.random(), distances[index])
+
+    def chase(self, indexes: np.ndarray, distances: np.ndarray) -> None:
+        """
+        Points the given enemies towards the player.
+
+        :param indexes: The MobStore indexes of the chasing enemies.
+        :param distances: Every enemy's distance from the player.
+        """
+
+        store = self.store
+        if Config.CHASE_FLOW_FIELD:
+            # Only recomputed when the player has moved onto a new tile
+            field = self.dungeon.flow_field
+            with self.profiler.phase('pathfinding'):
+                field.update(self.player.nearestPosition())
+            tiles = tiles_at(store.positions[indexes])
+            steps = field.directions(tiles)
+            # Head for the middle of the next tile rather than straight along the step, so an enemy off to one side
+            # of it's tile is brought back in line as it turns, instead of catching on the corner of a wall
+            speeds = store.speeds[indexes, None]
+            velocities = np.clip((tiles + steps) * Config.TILE_SIZE - store.positions[indexes], -speeds, speeds)
+            store.velocities[indexes] = np.where(steps.any(axis=1)[:, None], velocities, 0)
+            return
+
+        for index in indexes.tolist():
+            enemy = store.sprites[index]
+            try:
+                if enemy.needs_path(enemy.target.position):
+                    self.scheduler.request(enemy, enemy.target.position, distances[index])
+                else:
+                    enemy.tick(enemy.get_path(enemy.target.position))
+            except Exception:
+                import traceback
+                traceback.print_exc()
+
+    def on_screen(self) -> np.ndarray:
+        """
+        :return: True for every enemy entirely inside the viewport.
+        """
+
+        left, right, bottom, top = self.viewport or arcade.get_viewport()
+        edges = np.tile(self.store.positions, 2) + self.store.bounds
+        return ((edges[:, 1] > bottom) & (edges[:, 3] < bottom + Config.SCREEN_HEIGHT) &
+                (edges[:, 2] < left + Config.SCREEN_WIDTH) & (edges[:, 0] > left))
+
+    def move_enemies(self) -> None:
+        """
+        Runs one batched MobPhysics step over every enemy, with the player as a body they cannot walk through.
+        """
+
+        store = self.store
+        if not len(store):
+            return
+        player = np.array([self.player.position], dtype=float)
+        self.physics.step(store.positions, store.velocities, store.bounds, player, np.array([self.player.box()]))
+        store.sync()
+
+    def get_distance(self, enemy) -> float:
+        """
+        :return: The distance between an Enemy and the player.
+        """
+        x, y = self.store.positions[enemy.index]
+        return math.hypot(x - self.player.center_x, y - self.player.center_y)
 
     @staticmethod
     def draw_path(path: List[Tuple[int, int]]) -> None:
@@ -121,6 +269,373 @@ class MobHandler:
                 arcade.draw_line(*pos1, *pos2, color=arcade.color.RED)
 
 
+class AIScheduler(object):
+    """
+    Spreads Enemy path requests out over several frames.
+    Each frame, requests are served closest to the player first until the pathfinding budget is spent,
+    and the rest wait for the next frame. Waiting raises a request's priority, so none of them starve.
+    Serving a request starts it's search, which may finish on a later frame.
+    """
+
+    def __init__(self, budget: Optional[float] = Config.PATHFINDING_BUDGET_MS) -> None:
+        """
+        Initializes the AIScheduler.
+
+        :param budget: The number of milliseconds that may be spent on pathfinding each frame.
+                       None serves every request each frame, so the requests served do not depend on timing.
+        """
+
+        self.budget = None if budget is None else budget / 1000
+        # Maps each waiting Enemy to it's goal, it's distance from the player and the frames it has waited
+        self.requests = {}
+
+    def request(self, enemy: Enemy, end: Tuple[int, int], distance: float) -> None:
+        """
+        Asks for a new path for an Enemy. Replaces any request the Enemy already has waiting.
+
+        :param enemy: The Enemy to find a path for.
+        :param end: The pixel position the path should lead to.
+        :param distance: The Enemy's distance from the player, closer Enemies are served first.
+        """
+
+        waited = self.requests[enemy][2] if enemy in self.requests else 0
+        self.requests[enemy] = (end, distance, waited)
+
+    def priority(self, enemy: Enemy) -> float:
+        """
+        :return: The priority of an Enemy's request, lower is served sooner.
+        """
+        end, distance, waited = self.requests[enemy]
+        return distance / (1 + waited)
+
+    def run(self) -> int:
+        """
+        Serves waiting requests until the budget is spent. At least one request is always served.
+
+        :return: The number of requests served.
+        """
+
+        start = time.perf_counter()
+        served = 0
+        for enemy in sorted(self.requests, key=self.priority):
+            if served and self.budget is not None and time.perf_counter() - start >= self.budget:
+                break
+            end, distance, waited = self.requests.pop(enemy)
+            # Enemies may have been killed while they were waiting
+            if enemy.sprite_lists:
+                try:
+                    enemy.request_path(end)
+                    # Searches that were cached or ran on the main thread can be used right away
+                    if enemy.collect_path():
+                        enemy.tick(enemy.remaining_path())
+                except Exception:
+                    import traceback
+                    traceback.print_exc()
+            served += 1
+
+        for enemy, (end, distance, waited) in self.requests.items():
+            self.requests[enemy] = (end, distance, waited + 1)
+        return served
+
+    def clear(self) -> None:
+        """
+        Drops every waiting request.
+        """
+        self.requests.clear()
+
+
+class PhysicsEngine(object):
+    """
+    Moves a Sprite and stops it against walls, much like arcade's PhysicsEngineSimple.
+    Walls are found through the Dungeon's WallIndex, so only the few walls near the Sprite are checked.
+    """
+
+    def __init__(self, sprite: arcade.Sprite, walls: WallIndex) -> None:
+        """
+        Initializes the PhysicsEngine.
+
+        :param sprite: The moving Sprite.
+        :param walls: The WallIndex of the Dungeon the Sprite is in.
+        """
+
+        self.sprite = sprite
+        self.walls = walls
+
+    def collisions(self) -> List[arcade.Sprite]:
+        """
+        :return: Every wall the Sprite is currently touching.
+        """
+
+        return self.walls.collisions(self.sprite)
+
+    def unstick(self) -> None:
+        """
+        Moves the Sprite to the nearest free spot it can find, searching further and further out.
+        """
+
+        sprite = self.sprite
+        x, y = sprite.center_x, sprite.center_y
+        vary = 1
+        while vary <= Config.TILE_SIZE * 4:
+            for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                sprite.center_x, sprite.center_y = x + dx * vary, y + dy * vary
+                if not self.collisions():
+                    return
+            vary *= 2
+        sprite.center_x, sprite.center_y = x, y
+
+    def update(self) -> List[arcade.Sprite]:
+        """
+        Moves the Sprite along each axis in turn, and backs it out of anything it runs into.
+
+        :return: Every wall the Sprite ran into.
+        """
+
+        sprite = self.sprite
+        if self.collisions():
+            self.unstick()
+
+        complete_hit_list = []
+        if sprite.change_y:
+            start = sprite.center_y
+            sprite.center_y += sprite.change_y
+            hits = self.collisions()
+            if hits:
+                # Never back out further than where the Sprite started
+                if sprite.change_y > 0:
+                    sprite.top = min(hit.bottom for hit in hits) - 1
+                    sprite.center_y = max(sprite.center_y, start)
+                else:
+                    sprite.bottom = max(hit.top for hit in hits) + 1
+                    sprite.center_y = min(sprite.center_y, start)
+                complete_hit_list.extend(hits)
+
+        if sprite.change_x:
+            start = sprite.center_x
+            sprite.center_x += sprite.change_x
+            hits = self.collisions()
+            if hits:
+                if sprite.change_x > 0:
+                    sprite.right = min(hit.left for hit in hits) - 1
+                    sprite.center_x = max(sprite.center_x, start)
+                else:
+                    sprite.left = max(hit.right for hit in hits) + 1
+                    sprite.center_x = min(sprite.center_x, start)
+                complete_hit_list.extend(hits)
+
+        return complete_hit_list
+
+
+class MobStore(object):
+    """
+    Keeps the state of every Enemy in contiguous NumPy arrays, so it can be worked on for all of them at once.
+    Each Enemy is a view over one row of the arrays, found by it's index, and only draws what the arrays hold.
+    Removing an Enemy moves the last row into it's place, so the arrays never have gaps.
+    """
+
+    KINDS = ('ghost', 'frog')
+    # AI states
+    IDLE, WANDER, CHASE = range(3)
+    # AI level of detail tiers, from the most to the least work: chasing every frame, chasing every few frames,
+    # wandering around, and doing nothing at all
+    FULL, REDUCED, STEER, DORMANT = range(4)
+
+    # The name, shape of each row and type of each array
+    COLUMNS = (
+        ('positions', (2,), float),
+        ('velocities', (2,), float),
+        # The left, bottom, right and top edges of each Enemy relative to it's center, for MobPhysics
+        ('bounds', (4,), float),
+        ('speeds', (), float),
+        ('health', (), float),
+        ('armor', (), float),
+        ('kinds', (), np.int8),
+        ('states', (), np.int8),
+        ('tiers', (), np.int8),
+        # The positions last given to each Enemy's Sprite
+        ('drawn', (2,), float),
+        # The positions at the start of the last tick, to draw Enemies part way through their moves
+        ('previous', (2,), float),
+        # Whether each Enemy has a path search that has not been collected yet
+        ('pending', (), bool),
+    )
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty MobStore.
+        """
+
+        self.sprites = []
+        for name, shape, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros((0, *shape), dtype=dtype))
+
+    def add(self, enemy: Enemy, kind: str) -> int:
+        """
+        Adds a row for an Enemy, taking it's current position, hit box and health.
+
+        :param enemy: The Enemy to add. It must not be in another MobStore.
+        :param kind: The Enemy's monster type, one of KINDS.
+        :return: The Enemy's index.
+        """
+
+        row = {
+            'positions': enemy.position,
+            'velocities': (0, 0),
+            'bounds': enemy.box(),
+            'speeds': Config.MONSTER_MOVEMENT_SPEED,
+            'health': enemy.max_health,
+            'armor': enemy.max_armor,
+            'kinds': self.KINDS.index(kind),
+            'states': self.IDLE,
+            'tiers': self.DORMANT,
+            'drawn': enemy.position,
+            'previous': enemy.position,
+            'pending': False,
+        }
+        for name, shape, dtype in self.COLUMNS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.array([row[name]], dtype=dtype)]))
+
+        enemy.store, enemy.index = self, len(self.sprites)
+        self.sprites.append(enemy)
+        return enemy.index
+
+    def remove(self, enemy: Enemy) -> None:
+        """
+        Removes an Enemy's row. Does nothing if the Enemy is not in this MobStore.
+        """
+
+        if enemy.store is not self:
+            return
+        index, last = enemy.index, len(self.sprites) - 1
+        if index != last:
+            moved = self.sprites[last]
+            for name, shape, dtype in self.COLUMNS:
+                array = getattr(self, name)
+                array[index] = array[last]
+            self.sprites[index], moved.index = moved, index
+        for name, shape, dtype in self.COLUMNS:
+            setattr(self, name, getattr(self, name)[:last])
+        self.sprites.pop()
+        enemy.store = enemy.index = None
+
+    def distances(self, point: Tuple[float, float]) -> np.ndarray:
+        """
+        :return: The distance from every Enemy to a pixel position.
+        """
+        return np.hypot(self.positions[:, 0] - point[0], self.positions[:, 1] - point[1])
+
+    def sync(self, alpha: float = 1.0) -> None:
+        """
+        Moves the Sprite of every Enemy whose position has changed since it was last drawn.
+
+        :param alpha: How far through the last tick to draw each Enemy, from 0 at it's previous position
+                      to 1 at it's current position.
+        """
+
+        positions = self.positions if alpha >= 1 else self.previous + (self.positions - self.previous) * alpha
+        moved = np.flatnonzero((positions != self.drawn).any(axis=1))
+        for index, (x, y) in zip(moved.tolist(), positions[moved].tolist()):
+            self.sprites[index].position = (x, y)
+        self.drawn[moved] = positions[moved]
+
+    def __len__(self) -> int:
+        """
+        :return: The number of Enemies stored.
+        """
+        return len(self.sprites)
+
+
+class MobPhysics(object):
+    """
+    Moves every Enemy at once, as NumPy arrays of positions and velocities rather than one Sprite at a time.
+    Mobs are treated as boxes. Each axis is moved in turn: first every Mob is stopped at the edge of any wall tile
+    it's leading edge runs into, then any Mob that ran further into another body has it's move along that axis undone.
+    """
+
+    # How far from a wall tile's edge a stopped Mob is left, so it is not counted as inside the tile
+    GAP = 0.01
+
+    def __init__(self, walkable: np.ndarray) -> None:
+        """
+        Initializes the MobPhysics.
+
+        :param walkable: The Dungeon's walkable array, indexed [x, y].
+        """
+
+        self.walls = np.asarray(walkable) == 0
+
+    def blocked(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        :return: True where the tile at (xs, ys) is a wall. Tiles outside of the Dungeon are open.
+        """
+        return tile_lookup(self.walls, xs, ys, False)
+
+    def stop_at_walls(self, positions: np.ndarray, velocities: np.ndarray, bounds: np.ndarray,
+                      axis: int, start: np.ndarray) -> None:
+        """
+        Moves every Mob that has run into a wall tile back against the tile's edge, but never behind where it started.
+        """
+
+        other = 1 - axis
+        moving = velocities[:, axis]
+        forwards = moving > 0
+        # The leading edge along the axis, and the two tiles it spans along the other axis
+        lead = tiles_at(positions[:, axis] + np.where(forwards, bounds[:, axis + 2], bounds[:, axis]))
+        sides = tiles_at(positions[:, other, None] + bounds[:, [other, other + 2]])
+        if axis == 0:
+            hit = self.blocked(lead, sides[:, 0]) | self.blocked(lead, sides[:, 1])
+        else:
+            hit = self.blocked(sides[:, 0], lead) | self.blocked(sides[:, 1], lead)
+        hit &= moving != 0
+        if not hit.any():
+            return
+
+        stop = np.where(forwards,
+                        (lead - 0.5) * Config.TILE_SIZE - bounds[:, axis + 2] - self.GAP,
+                        (lead + 0.5) * Config.TILE_SIZE - bounds[:, axis] + self.GAP)
+        stop = np.where(forwards, np.maximum(stop, start), np.minimum(stop, start))
+        positions[hit, axis] = stop[hit]
+
+    def stop_at_bodies(self, positions: np.ndarray, velocities: np.ndarray, bounds: np.ndarray,
+                       axis: int, start: np.ndarray, obstacles: np.ndarray, obstacle_bounds: np.ndarray) -> None:
+        """
+        Undoes the move along an axis of every Mob that moved towards a body it now overlaps.
+        Mobs moving apart are left alone, so Mobs that start out overlapping can separate.
+        """
+
+        count = len(positions)
+        everything = np.concatenate([positions, obstacles])
+        firsts, seconds = box_overlaps(everything, np.concatenate([bounds, obstacle_bounds]))
+        movers, others = np.concatenate([firsts, seconds]), np.concatenate([seconds, firsts])
+        mobile = movers < count
+        movers, others = movers[mobile], others[mobile]
+        closer = (everything[others, axis] - everything[movers, axis]) * velocities[movers, axis] > 0
+        blocked = movers[closer]
+        positions[blocked, axis] = start[blocked]
+
+    def step(self, positions: np.ndarray, velocities: np.ndarray, bounds: np.ndarray,
+             obstacles: np.ndarray = None, obstacle_bounds: np.ndarray = None) -> None:
+        """
+        Moves every Mob by it's velocity, along the y axis and then the x axis like arcade's physics engines.
+
+        :param positions: The center of each Mob, shaped (n, 2). Updated in place.
+        :param velocities: The change in x and y of each Mob this step, shaped (n, 2).
+        :param bounds: The left, bottom, right and top edges of each Mob relative to it's center, shaped (n, 4).
+        :param obstacles: The centers of any bodies that block the Mobs but are not moved, shaped (m, 2).
+        :param obstacle_bounds: The edges of each obstacle relative to it's center, shaped (m, 4).
+        """
+
+        if obstacles is None:
+            obstacles, obstacle_bounds = np.empty((0, 2)), np.empty((0, 4))
+        for axis in (1, 0):
+            if not velocities[:, axis].any():
+                continue
+            start = positions[:, axis].copy()
+            positions[:, axis] += velocities[:, axis]
+            self.stop_at_walls(positions, velocities, bounds, axis, start)
+            self.stop_at_bodies(positions, velocities, bounds, axis, start, obstacles, obstacle_bounds)
+
+
 class Mob(arcade.Sprite):
     """
     Represents a Mob. No defined behaviour, it has no intelligence.
@@ -142,7 +657,23 @@ class Mob(arcade.Sprite):
         self.target = None
         self.level = None
 
-    
+    def box(self) -> Tuple[float, float, float, float]:
+        """
+        :return: The left, bottom, right and top edges of the Mob's hit box, relative to it's center.
+        """
+        return (self.left - self.center_x, self.bottom - self.center_y,
+                self.right - self.center_x, self.top - self.center_y)
+
+    def nearestPosition(self) -> Tuple[int, int]:
+        """
+        Returns the nearest absolute dungeon tile the Mob is placed on.
+
+        :return: A tuple containing the Mob's dungeon tile position.
+        """
+        return (round(self.center_x / Config.TILE_SIZE),
+                round(self.center_y / Config.TILE_SIZE))
+
+
 class Player(Mob):
     """
     Represents a Player.
@@ -222,52 +753,157 @@ class Enemy(Mob):
     Will take basic offensive actions against Player objects.
     """
 
+    # The MobStore holding the Enemy's state, and it's row in it. Set by MobStore.add()
+    store = None
+    index = None
+
     def __init__(self, *args, **kwargs) -> None:
         super(Enemy, self).__init__(*args, **kwargs)
-        self.monster_type = ''
+        # The path currently being walked, and the goal tile it leads to
+        self.path = []
+        self.path_goal = None
+        # A search for a new path to path_goal that has not been collected yet
+        self.path_future = None
+
+    @property
+    def health(self) -> float:
+        """
+        :return: The Enemy's health, kept in it's MobStore.
+        """
+        return self.store.health[self.index] if self.store is not None else self.max_health
 
-    def nearestPosition(self) -> Tuple[int, int]:
+    @health.setter
+    def health(self, value: float) -> None:
+        # Enemies have no state until they are added to a MobStore, which starts them at full health
+        if self.store is not None:
+            self.store.health[self.index] = value
+
+    @property
+    def armor(self) -> float:
         """
-        Returns the nearest absolute dungeon tile the Mob is placed on.
+        :return: The Enemy's armor, kept in it's MobStore.
+        """
+        return self.store.armor[self.index] if self.store is not None else self.max_armor
 
-        :return: A tuple containing the Mob's dungeon tile position.
+    @armor.setter
+    def armor(self, value: float) -> None:
+        if self.store is not None:
+            self.store.armor[self.index] = value
+
+    @property
+    def monster_type(self) -> str:
         """
-        return (round(self.center_x / Config.TILE_SIZE),
-                round(self.center_y / Config.TILE_SIZE))
+        :return: The kind of monster the Enemy is, one of MobStore.KINDS.
+        """
+        return MobStore.KINDS[self.store.kinds[self.index]]
+
+    @property
+    def speed(self) -> float:
+        """
+        :return: The Enemy's current movement speed, kept in it's MobStore.
+        """
+        return self.store.speeds[self.index]
+
+    def set_velocity(self, change_x: float, change_y: float) -> None:
+        """
+        Sets the change in position the Enemy will move by in the next MobPhysics step.
+        """
+        self.store.velocities[self.index] = change_x, change_y
 
     def tick(self, path: Tuple[int, int] = None) -> None:
         """
         A on_update function, the Mob should decide it's next actions here.
         """
-        near_pos = self.nearestPosition()
-        
-        curpos, nextpos = near_pos, path[1]
-        # print(curpos, nextpos)
+        if len(path) > 1:
+            self.move_towards(path[1])
+        else:
+            self.set_velocity(0, 0)
+
+    def move_towards(self, nextpos: Tuple[int, int]) -> None:
+        """
+        Sets the Mob's velocity towards a neighbouring dungeon tile.
+
+        :param nextpos: The tile position to move towards.
+        """
+        curpos = self.nearestPosition()
+        speed = self.speed
 
         if nextpos[0] > curpos[0]:
-            self.change_x = self.speed
+            change_x = speed
         elif nextpos[0] < curpos[0]:
-            self.change_x = -self.speed
+            change_x = -speed
         else:
-            self.change_x = 0
+            change_x = 0
 
         if nextpos[1] > curpos[1]:
-            self.change_y = self.speed
+            change_y = speed
         elif nextpos[1] < curpos[1]:
-            self.change_y = -self.speed
+            change_y = -speed
         else:
-            self.change_y = 0
+            change_y = 0
+        self.set_velocity(change_x, change_y)
+
+    def needs_path(self, end: Tuple[int, int]) -> bool:
+        """
+        :param end: The pixel position the Mob wants to reach.
+        :return: True if a new path must be searched for, rather than walking or waiting on the current one.
+        """
+
+        end = (round(end[0] / Config.TILE_SIZE), round(end[1] / Config.TILE_SIZE))
+        if end != self.path_goal:
+            return True
+        if self.path_future is not None:
+            return False
+        # Hierarchical paths are only made of single steps up to the edge of the current room
+        path = self.remaining_path()
+        return not path or (len(path) > 1 and max(abs(path[1][0] - path[0][0]), abs(path[1][1] - path[0][1])) > 1)
+
+    def request_path(self, end: Tuple[int, int]) -> None:
+        """
+        Starts searching for a new path without waiting for it. The path is picked up by collect_path.
+
+        :param end: The pixel position the path should lead to.
+        """
+
+        self.path_goal = (round(end[0] / Config.TILE_SIZE), round(end[1] / Config.TILE_SIZE))
+        self.path_future = self.dungeon.request_path(self.nearestPosition(), self.path_goal)
+        self.store.pending[self.index] = True
+
+    def collect_path(self) -> bool:
+        """
+        Switches to the path from request_path once it's search has finished.
+
+        :return: True if a new path was picked up.
+        """
+
+        if self.path_future is None or not self.path_future.done():
+            return False
+        future, self.path_future = self.path_future, None
+        self.store.pending[self.index] = False
+        self.path = future.result() if future.exception() is None else []
+        return True
+
+    def remaining_path(self) -> List[Tuple[int, int]]:
+        """
+        :return: The rest of the current path, starting at the Mob's current tile. Empty if the Mob is not on it.
+        """
+
+        start = self.nearestPosition()
+        if start not in self.path:
+            return []
+        return self.path[self.path.index(start):]
 
     def get_path(self, end: Tuple[int, int] = None) -> List[Tuple[int, int]]:
         """
         Returns the path to get to the Mob's target in absolute integer positions.
+        The previous path keeps being walked while it still leads to the same goal and the Mob is on it.
 
         :param end: A the endpoint tuple. Must be a valid position within the matrix.
-        :return:
+        :return: The remaining path, starting at the Mob's current tile.
         """
 
-        start, end = self.nearestPosition(), (round(end[0] / Config.TILE_SIZE), round(end[1] / Config.TILE_SIZE))
-        start, end = self.dungeon.grid.node(*start), self.dungeon.grid.node(*end)
-        paths, runs = self.dungeon.finder.find_path(start, end, self.dungeon.grid)
-        self.dungeon.grid.cleanup()
-        return paths
+        if self.needs_path(end):
+            self.path_goal = (round(end[0] / Config.TILE_SIZE), round(end[1] / Config.TILE_SIZE))
+            self.path, self.path_future = self.dungeon.find_path(self.nearestPosition(), self.path_goal), None
+            self.store.pending[self.index] = False
+        return self.remaining_path()
@@ -1,9 +1,27 @@
+"""
+path.py
+Pathfinding helpers that work directly on the Dungeon's walkability array.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 from pathfinding.core.diagonal_movement import DiagonalMovement
 from pathfinding.core.grid import Grid
 from pathfinding.finder.a_star import AStarFinder
 
+# Neighbour offsets and the cost of stepping onto them
+NEIGHBOURS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+              (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2))]
 
-def route(start, end, matrix) -> path:
+
+def route(start, end, matrix) -> List[Tuple[int, int]]:
     """
     Take a matrix of the level in the form wighted numbers, a start and stop point, and return a path between them.
 
@@ -19,3 +37,533 @@ def route(start, end, matrix) -> path:
     path, runs = finder.find_path(start, end, grid)
 
     return path
+
+
+class GridSearch(object):
+    """
+    A* over a walkability array indexed [x, y], using the pathfinding package.
+    Every GridSearch owns it's own Grid, so separate instances may search at the same time.
+    Diagonal steps may not cut across the corner of a wall.
+    """
+
+    def __init__(self, walkable: np.ndarray) -> None:
+        """
+        Builds the Grid for a walkability array.
+
+        :param walkable: A 2D uint8 array, 0s are walls and anything else is walkable.
+        """
+
+        self.shape = np.shape(walkable)
+        # The pathfinding Grid is indexed [y][x]
+        self.grid = Grid(matrix=np.transpose(walkable).tolist())
+        self.finder = AStarFinder(diagonal_movement=DiagonalMovement.only_when_no_obstacle)
+
+    def __call__(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a path between two tiles.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A list of tile positions from start to end, or an empty list if there is no path.
+        """
+
+        if not all(0 <= position[axis] < self.shape[axis] for position in (start, end) for axis in (0, 1)):
+            return []
+        path, runs = self.finder.find_path(self.grid.node(*start), self.grid.node(*end), self.grid)
+        self.grid.cleanup()
+        return path
+
+
+# The search belonging to each background worker
+_worker = threading.local()
+
+
+def _start_worker(walkable: np.ndarray, finder: str) -> None:
+    """
+    Gives a background worker it's own search.
+    """
+    _worker.search = SEARCHES[finder](walkable)
+
+
+def _search(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """
+    Runs a search on a background worker.
+    """
+    return _worker.search(start, end)
+
+
+class PathService(object):
+    """
+    Searches for paths on a pool of background workers, so that searching does not block the game loop.
+    Workers search over their own copy of the walkability array, nothing is shared with the main thread.
+    """
+
+    def __init__(self, walkable: np.ndarray, workers: int = 2, processes: bool = True, finder: str = 'astar') -> None:
+        """
+        Starts the worker pool.
+
+        :param walkable: A 2D uint8 array, 0s are walls and anything else is walkable.
+        :param workers: The number of background workers.
+        :param processes: Use worker processes, which can run on spare cores. Otherwise threads are used.
+        :param finder: The name of the search to use, one of SEARCHES.
+        """
+
+        walkable = np.array(walkable, dtype=np.uint8)
+        walkable.setflags(write=False)
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor(max_workers=workers, initializer=_start_worker, initargs=(walkable, finder))
+
+    def submit(self, start: Tuple[int, int], end: Tuple[int, int]) -> Future:
+        """
+        Queues a search between two tiles.
+
+        :return: A Future holding the path, in the same format the searches return.
+        """
+        return self.executor.submit(_search, (int(start[0]), int(start[1])), (int(end[0]), int(end[1])))
+
+    def shutdown(self) -> None:
+        """
+        Stops the workers. Searches that have not started yet are abandoned.
+        """
+        self.executor.shutdown(wait=False)
+
+
+def _shift(offset: int, length: int) -> Tuple[slice, slice]:
+    """
+    Pairs up the cells along one axis with the cells that are `offset` away from them.
+
+    :return: A tuple of slices, the first over the cells and the second over their neighbours.
+    """
+
+    if offset > 0:
+        return slice(0, length - offset), slice(offset, length)
+    elif offset < 0:
+        return slice(-offset, length), slice(0, length + offset)
+    return slice(0, length), slice(0, length)
+
+
+class DistanceTransform(object):
+    """
+    A vectorized wavefront distance transform over a walkability array indexed [x, y].
+    Distances are relaxed across the whole array at once in each direction until they settle,
+    instead of expanding one node at a time.
+    Diagonal steps may not cut across the corner of a wall.
+    """
+
+    def __init__(self, walkable: np.ndarray) -> None:
+        """
+        Precomputes the cost of every move on the array.
+
+        :param walkable: A 2D uint8 array, 0s are walls and anything else is walkable.
+        """
+
+        self.walkable = np.asarray(walkable, dtype=np.uint8) != 0
+        self.shape = self.walkable.shape
+        width, height = self.shape
+
+        # For each direction: the cells, their neighbours in that direction and the cost of stepping between them.
+        # Impossible moves cost infinity, except stepping out of a wall, which is allowed to free stuck Mobs.
+        self.moves = []
+        for dx, dy, cost in NEIGHBOURS:
+            (cell_x, near_x), (cell_y, near_y) = _shift(dx, width), _shift(dy, height)
+            cells, neighbours = (cell_x, cell_y), (near_x, near_y)
+            allowed = self.walkable[cells] & self.walkable[neighbours]
+            if dx and dy:
+                allowed &= self.walkable[near_x, cell_y] & self.walkable[cell_x, near_y]
+            costs = np.where(allowed, cost, np.inf)
+            escape = np.where(self.walkable[cells], costs, cost)
+            self.moves.append((cells, neighbours, costs, escape))
+
+    def distances(self, goal: Tuple[int, int]) -> np.ndarray:
+        """
+        Computes the path distance from every tile to the goal.
+
+        :param goal: The goal tile position.
+        :return: A float array of distances, infinity where the goal cannot be reached.
+        """
+
+        distances = np.full(self.shape, np.inf)
+        if not self.inside(goal) or not self.walkable[goal]:
+            return distances
+        distances[goal] = 0
+
+        previous = None
+        while previous is None or not np.array_equal(previous, distances):
+            previous = distances.copy()
+            for cells, neighbours, costs, _ in self.moves:
+                np.minimum(distances[cells], distances[neighbours] + costs, out=distances[cells])
+        return distances
+
+    def descent(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Finds the best direction to step in from every tile, given the distances from distances().
+
+        :param distances: The array returned by distances().
+        :return: An int8 array of indexes into NEIGHBOURS, -1 where there is no step to take.
+        """
+
+        candidates = np.full((len(self.moves),) + self.shape, np.inf)
+        for index, (cells, neighbours, _, escape) in enumerate(self.moves):
+            candidates[(index,) + cells] = distances[neighbours] + escape
+
+        steps = np.argmin(candidates, axis=0).astype(np.int8)
+        best = np.min(candidates, axis=0)
+        steps[(distances == 0) | np.isinf(best)] = -1
+        return steps
+
+    def path(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a path between two tiles by following the distances to the goal downhill.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A list of tile positions from start to end, or an empty list if there is no path.
+        """
+
+        if not self.inside(start):
+            return []
+        distances = self.distances(end)
+        if np.isinf(distances[start]):
+            return []
+        steps = self.descent(distances)
+
+        path = [tuple(start)]
+        while path[-1] != tuple(end):
+            dx, dy, _ = NEIGHBOURS[steps[path[-1]]]
+            path.append((path[-1][0] + dx, path[-1][1] + dy))
+        return path
+
+    def inside(self, position: Tuple[int, int]) -> bool:
+        """
+        :return: True if the tile position lies within the array.
+        """
+        return 0 <= position[0] < self.shape[0] and 0 <= position[1] < self.shape[1]
+
+
+class HierarchicalSearch(object):
+    """
+    Hierarchical pathfinding (HPA*) over a walkability array split into square rooms.
+    The entrances between neighbouring rooms, and the distances between the entrances of each room,
+    are precomputed into an abstract graph. Searches run over that small graph, and only the part of
+    the path inside the starting room is refined into single tiles. The rest of the path is made of
+    entrance tiles, so callers should search again once they reach the end of the refined part.
+    Neighbouring entrances of the same room are refined too, so a diagonal step never cuts past a wall's corner.
+    """
+
+    def __init__(self, walkable: np.ndarray, room_size: int = 10) -> None:
+        """
+        Builds the abstract graph.
+
+        :param walkable: A 2D uint8 array, 0s are walls and anything else is walkable.
+        :param room_size: The width of the square rooms, in tiles.
+        """
+
+        self.walkable = np.asarray(walkable, dtype=np.uint8) != 0
+        self.shape = self.walkable.shape
+        self.room_size = room_size
+        width, height = self.shape
+
+        # A DistanceTransform limited to each room
+        self.rooms = {}
+        for x in range(0, width, room_size):
+            for y in range(0, height, room_size):
+                room = self.room_of((x, y))
+                self.rooms[room] = DistanceTransform(self.walkable[x:x + room_size, y:y + room_size])
+
+        # The entrance tiles of each room, and the abstract edges leaving each entrance tile
+        self.entrances = defaultdict(list)
+        self.edges = defaultdict(list)
+        for x in range(room_size, width, room_size):
+            self._connect([((x - 1, y), (x, y)) for y in range(height)])
+        for y in range(room_size, height, room_size):
+            self._connect([((x, y - 1), (x, y)) for x in range(width)])
+
+        for room, entrances in self.entrances.items():
+            for entrance in entrances:
+                distances = self._room_distances(entrance)
+                for other in entrances:
+                    cost = distances[self._local(other)]
+                    if other != entrance and not np.isinf(cost):
+                        self.edges[entrance].append((other, float(cost)))
+
+    def room_of(self, position: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        :return: The room a tile position belongs to.
+        """
+        return position[0] // self.room_size, position[1] // self.room_size
+
+    def _local(self, position: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        :return: The tile position relative to the bottom left corner of it's room.
+        """
+        return position[0] % self.room_size, position[1] % self.room_size
+
+    def _room_distances(self, goal: Tuple[int, int]) -> np.ndarray:
+        """
+        :return: The distances from every tile in the goal's room to the goal, without leaving the room.
+        """
+        return self.rooms[self.room_of(goal)].distances(self._local(goal))
+
+    def _connect(self, pairs: List[Tuple[Tuple[int, int], Tuple[int, int]]]) -> None:
+        """
+        Adds entrances along the border between two rows of rooms.
+        Every unbroken run of open tile pairs becomes one entrance, placed in the middle of the run.
+
+        :param pairs: Neighbouring tile pairs along the border, in order. The first tile of each is on the near side.
+        """
+
+        run = []
+        for index in range(len(pairs) + 1):
+            is_open = index < len(pairs) and self.walkable[pairs[index][0]] and self.walkable[pairs[index][1]]
+            # Runs may not continue past the corner of a room
+            if run and (not is_open or index % self.room_size == 0):
+                near_entrance, far_entrance = run[len(run) // 2]
+                for entrance, other in ((near_entrance, far_entrance), (far_entrance, near_entrance)):
+                    if entrance not in self.entrances[self.room_of(entrance)]:
+                        self.entrances[self.room_of(entrance)].append(entrance)
+                    self.edges[entrance].append((other, 1.0))
+                run = []
+            if is_open:
+                run.append(pairs[index])
+
+    def _refine(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a single tile path between two tiles of the same room, without leaving the room.
+        """
+
+        origin_x, origin_y = start[0] - start[0] % self.room_size, start[1] - start[1] % self.room_size
+        path = self.rooms[self.room_of(start)].path(self._local(start), self._local(end))
+        return [(x + origin_x, y + origin_y) for x, y in path]
+
+    def _abstract_search(self, first: Dict[Tuple[int, int], float], last: Dict[Tuple[int, int], float],
+                         end: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+        """
+        A* over the abstract graph.
+
+        :param first: The entrances of the starting room that the start can reach, and their distances.
+        :param last: The entrances of the goal room that can reach the goal, and their distances.
+        :param end: The goal tile position, used for the heuristic.
+        :return: The entrance tiles to pass through, or None if the goal cannot be reached.
+        """
+
+        def heuristic(node: Tuple[int, int]) -> float:
+            dx, dy = abs(node[0] - end[0]), abs(node[1] - end[1])
+            return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+        # The goal is represented by None, and the counter stops ties from comparing None with tiles
+        counter = itertools.count()
+        best, parents = dict(first), dict.fromkeys(first)
+        queue = [(cost + heuristic(node), cost, next(counter), node) for node, cost in first.items()]
+        heapq.heapify(queue)
+        while queue:
+            _, cost, _, node = heapq.heappop(queue)
+            if node is None:
+                nodes = []
+                node = parents[None]
+                while node is not None:
+                    nodes.append(node)
+                    node = parents[node]
+                return nodes[::-1]
+            if cost > best[node]:
+                continue
+
+            neighbours = list(self.edges[node])
+            if node in last:
+                neighbours.append((None, last[node]))
+            for neighbour, step in neighbours:
+                if cost + step < best.get(neighbour, math.inf):
+                    best[neighbour], parents[neighbour] = cost + step, node
+                    estimate = 0 if neighbour is None else heuristic(neighbour)
+                    heapq.heappush(queue, (cost + step + estimate, cost + step, next(counter), neighbour))
+        return None
+
+    def __call__(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a path between two tiles. Only the steps inside the starting room are single tiles.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A list of tile positions from start to end, or an empty list if there is no path.
+        """
+
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        for position in (start, end):
+            if not (0 <= position[0] < self.shape[0] and 0 <= position[1] < self.shape[1]) or \
+                    not self.walkable[position]:
+                return []
+
+        start_room = self.room_of(start)
+        if start_room == self.room_of(end):
+            path = self._refine(start, end)
+            if path:
+                return path
+
+        from_start, to_end = self._room_distances(start), self._room_distances(end)
+        first = {entrance: float(from_start[self._local(entrance)]) for entrance in self.entrances[start_room]}
+        last = {entrance: float(to_end[self._local(entrance)]) for entrance in self.entrances[self.room_of(end)]}
+        first = {entrance: cost for entrance, cost in first.items() if not math.isinf(cost)}
+        last = {entrance: cost for entrance, cost in last.items() if not math.isinf(cost)}
+        nodes = self._abstract_search(first, last, end)
+        if nodes is None:
+            return []
+
+        # Refine the path up to the last entrance before it leaves the starting room
+        count = 1
+        while count < len(nodes) and self.room_of(nodes[count]) == start_room:
+            count += 1
+        path = self._refine(start, nodes[count - 1])
+        for node in nodes[count:] + [end]:
+            last = path[-1]
+            if node == last:
+                continue
+            if self.room_of(node) == self.room_of(last) and max(abs(node[0] - last[0]), abs(node[1] - last[1])) == 1:
+                # Entrances next to each other look like a single step, but may be diagonal across a wall's corner
+                path.extend(self._refine(last, node)[1:])
+            else:
+                path.append(node)
+        return path
+
+
+class JumpPointSearch(object):
+    """
+    Jump Point Search over a walkability array indexed [x, y].
+    On a uniform cost grid, A* only needs to stop at the tiles where the best direction to travel can change,
+    so straight runs of open tiles are skipped over instead of being expanded one node at a time.
+    Diagonal steps may not cut across the corner of a wall, the same as GridSearch.
+    """
+
+    def __init__(self, walkable: np.ndarray) -> None:
+        """
+        :param walkable: A 2D uint8 array, 0s are walls and anything else is walkable.
+        """
+
+        self.shape = np.shape(walkable)
+        self.grid = (np.asarray(walkable) != 0).tolist()
+        self.end = None
+
+    def walkable(self, x: int, y: int) -> bool:
+        """
+        :return: True if the tile is within the array and is not a wall.
+        """
+        return 0 <= x < self.shape[0] and 0 <= y < self.shape[1] and self.grid[x][y]
+
+    def _neighbours(self, x: int, y: int, parent: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        Returns the directions worth travelling in from a jump point, pruning those the parent already covers.
+        """
+
+        walkable = self.walkable
+        if parent is None:
+            return [(dx, dy) for dx, dy, _ in NEIGHBOURS
+                    if walkable(x + dx, y + dy) and (not (dx and dy) or walkable(x + dx, y) and walkable(x, y + dy))]
+
+        dx, dy = (x > parent[0]) - (x < parent[0]), (y > parent[1]) - (y < parent[1])
+        directions = []
+        if dx and dy:
+            if walkable(x, y + dy):
+                directions.append((0, dy))
+            if walkable(x + dx, y):
+                directions.append((dx, 0))
+            if walkable(x, y + dy) and walkable(x + dx, y):
+                directions.append((dx, dy))
+        elif dx:
+            up, down = walkable(x, y + 1), walkable(x, y - 1)
+            if walkable(x + dx, y):
+                directions.append((dx, 0))
+                directions.extend(direction for direction, side in (((dx, 1), up), ((dx, -1), down)) if side)
+            directions.extend(direction for direction, side in (((0, 1), up), ((0, -1), down)) if side)
+        else:
+            right, left = walkable(x + 1, y), walkable(x - 1, y)
+            if walkable(x, y + dy):
+                directions.append((0, dy))
+                directions.extend(direction for direction, side in (((1, dy), right), ((-1, dy), left)) if side)
+            directions.extend(direction for direction, side in (((1, 0), right), ((-1, 0), left)) if side)
+        return directions
+
+    def _jump(self, x: int, y: int, dx: int, dy: int) -> Optional[Tuple[int, int]]:
+        """
+        Travels from a tile in a straight line until reaching a jump point.
+
+        :return: The jump point, or None if the line runs into a wall first.
+        """
+
+        walkable = self.walkable
+        while True:
+            x, y = x + dx, y + dy
+            if not walkable(x, y):
+                return None
+            if (x, y) == self.end:
+                return x, y
+
+            if dx and dy:
+                # Diagonal travel stops wherever a horizontal or vertical line from it would find a jump point
+                if self._jump(x, y, dx, 0) is not None or self._jump(x, y, 0, dy) is not None:
+                    return x, y
+            elif dx:
+                if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or \
+                        (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                    return x, y
+            elif (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or \
+                    (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                return x, y
+
+            if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                return None
+
+    def __call__(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Finds a path between two tiles.
+
+        :param start: The starting tile position.
+        :param end: The goal tile position.
+        :return: A list of single tile steps from start to end, or an empty list if there is no path.
+        """
+
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        if not self.walkable(*start) or not self.walkable(*end):
+            return []
+        self.end = end
+
+        def octile(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+            dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+            return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+        best, parents, closed = {start: 0.0}, {start: None}, set()
+        queue = [(octile(start, end), 0.0, start)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == end:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+
+            for dx, dy in self._neighbours(node[0], node[1], parents[node]):
+                jump = self._jump(node[0], node[1], dx, dy)
+                if jump is None or jump in closed:
+                    continue
+                distance = cost + octile(node, jump)
+                if distance < best.get(jump, math.inf):
+                    best[jump], parents[jump] = distance, node
+                    heapq.heappush(queue, (distance + octile(jump, end), distance, jump))
+        else:
+            return []
+
+        # Fill in the single steps between the jump points, which are always in a straight line
+        jumps = [end]
+        while parents[jumps[-1]] is not None:
+            jumps.append(parents[jumps[-1]])
+        path = [start]
+        for x, y in reversed(jumps[:-1]):
+            while path[-1] != (x, y):
+                last_x, last_y = path[-1]
+                path.append((last_x + (x > last_x) - (x < last_x), last_y + (y > last_y) - (y < last_y)))
+        return path
+
+
+# The searches that can be chosen with Config.PATH_FINDER
+SEARCHES = {
+    'astar': GridSearch,
+    'hpa': HierarchicalSearch,
+    'jps': JumpPointSearch
+}
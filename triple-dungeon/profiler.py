@@ -0,0 +1,145 @@
+"""
+profiler.py
+Times each phase of every frame, to find out where the time goes when the game stutters.
+"""
+
+import collections
+import contextlib
+import csv
+import time
+from typing import Dict, Iterator, Tuple
+
+import arcade
+import numpy as np
+
+from config import Config
+from hud import Label, screen_space
+
+
+class FrameProfiler(object):
+    """
+    Adds up the time spent in each phase of a frame, and keeps the totals of recent frames.
+    Percentiles are taken over the last Config.PROFILER_WINDOW frames, and the last Config.PROFILER_HISTORY
+    frames can be written out as CSV. Frames are ended by whatever runs the game loop, with end_frame().
+    """
+
+    PHASES = ('mobs', 'physics', 'pathfinding', 'bullets', 'scroll', 'dungeon_render', 'mob_render', 'hud')
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, window: int = Config.PROFILER_WINDOW, history: int = Config.PROFILER_HISTORY) -> None:
+        """
+        Initializes the FrameProfiler.
+
+        :param window: The number of frames percentiles are taken over.
+        :param history: The number of frames kept for CSV export.
+        """
+
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+        self.samples = {phase: collections.deque(maxlen=window) for phase in self.PHASES + ('frame',)}
+        # Each ended frame's number, phase times and total time
+        self.history = collections.deque(maxlen=history)
+        self.frames = 0
+        self.last = time.perf_counter()
+        # The phases currently being timed, innermost last
+        self.running = []
+        # One Label per row of the drawn table, made on the first draw
+        self.labels = []
+        self.table = arcade.SpriteList()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the code run inside it, adding it to a phase of the current frame.
+        A phase timed inside another phase is taken out of the outer phase's time, so no time is counted twice.
+
+        :param name: One of PHASES.
+        """
+
+        start = time.perf_counter()
+        self.running.append(name)
+        try:
+            yield
+        finally:
+            self.running.pop()
+            elapsed = time.perf_counter() - start
+            self.current[name] += elapsed
+            if self.running:
+                self.current[self.running[-1]] -= elapsed
+
+    def end_frame(self) -> None:
+        """
+        Stores the current frame's times and starts the next frame.
+        The frame's total is the time since the last frame ended, including time spent outside of any phase.
+        """
+
+        now = time.perf_counter()
+        times = {phase: seconds * 1000 for phase, seconds in self.current.items()}
+        times['frame'] = (now - self.last) * 1000
+        for phase, milliseconds in times.items():
+            self.samples[phase].append(milliseconds)
+        self.history.append((self.frames, times))
+
+        self.frames += 1
+        self.last = now
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+
+    def percentiles(self, phase: str) -> Tuple[float, ...]:
+        """
+        :param phase: One of PHASES, or 'frame' for the whole frame.
+        :return: The 50th, 95th and 99th percentile times of the phase over recent frames, in milliseconds.
+        """
+
+        samples = self.samples[phase]
+        if not samples:
+            return (0.0,) * len(self.PERCENTILES)
+        return tuple(np.percentile(samples, self.PERCENTILES).tolist())
+
+    def report(self) -> Dict[str, Tuple[float, ...]]:
+        """
+        :return: The percentiles of every phase and of the whole frame.
+        """
+        return {phase: self.percentiles(phase) for phase in self.samples}
+
+    def update_table(self, left: float, top: float) -> None:
+        """
+        Shows every phase's current percentiles in the table's Labels, making the Labels if there are none yet.
+
+        :param left: The screen position of the table's left edge, in pixels.
+        :param top: The screen position of the table's top edge, in pixels.
+        """
+
+        lines = [f"{'phase':<15}" + ''.join(f'{f"p{percentile}":>8}' for percentile in self.PERCENTILES)]
+        for phase, values in self.report().items():
+            lines.append(f'{phase:<15}' + ''.join(f'{value:8.2f}' for value in values))
+        if not self.labels:
+            self.labels = [Label(left, top - 20 * (row + 1), arcade.color.WHITE, 14, 'Courier New')
+                           for row in range(len(lines))]
+            self.table.extend(self.labels)
+        for label, line in zip(self.labels, lines):
+            label.set_text(line)
+
+    def draw(self, left: float, top: float) -> None:
+        """
+        Draws a table of every phase's percentiles, fixed to the screen.
+
+        :param left: The screen position of the table's left edge, in pixels.
+        :param top: The screen position of the table's top edge, in pixels.
+        """
+
+        self.update_table(left, top)
+        with screen_space():
+            self.table.draw()
+
+    def write_csv(self, path: str) -> None:
+        """
+        Writes the time of every phase in every frame kept, in milliseconds, to a CSV file.
+
+        :param path: The file to write.
+        """
+
+        columns = self.PHASES + ('frame',)
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('number',) + columns)
+            for number, times in self.history:
+                writer.writerow([number] + [f'{times[column]:.4f}' for column in columns])
@@ -3,33 +3,331 @@ projectiles.py
 Organizes classes related to projectiles
 """
 
+import math
+from typing import List, Tuple, Type
+
 import arcade
+import numpy as np
+
+from spatial import ViewList, in_view, point_hits, tile_lookup, tiles_at
+from sprites import textures
 
 
 class Projectile(arcade.Sprite):
     """
     Represents a Projectile. Damage, sprite, speed, range, collision list?
     """
-    def __init__(self, speed=7, damage=0, range=100, *args, **kwargs) -> None:
+    def __init__(self, speed=7, damage=0, range=100, lifetime=None, *args, **kwargs) -> None:
         # Set up parent class
         super().__init__()
 
         self.speed = speed
         self.damage = damage  # unimplemented
         self.texture = None
-        self.range = range  # unimplemented
+        # The number of pixels the Projectile flies, and the number of updates it lasts, before expiring
+        self.range = range
+        self.lifetime = lifetime
+        self.travelled = 0
+        self.age = 0
         self.collision_list = []
 
+    def launch(self, start: Tuple[float, float], angle: float) -> None:
+        """
+        Places the Projectile and sends it flying, as if it had just been created.
+
+        :param start: The pixel position to fire from.
+        :param angle: The direction to fly in, in radians.
+        """
+
+        self.center_x, self.center_y = start
+        # Angle the sprite so it doesn't look like it is flying sideways.
+        self.angle = math.degrees(angle)
+        self.change_x = math.cos(angle) * self.speed
+        self.change_y = math.sin(angle) * self.speed
+        self.travelled = self.age = 0
+
+    def update(self) -> None:
+        """
+        Moves the Projectile and counts how far it has flown.
+        """
+
+        super().update()
+        self.travelled += self.speed
+        self.age += 1
+
+    @property
+    def expired(self) -> bool:
+        """
+        :return: True once the Projectile has flown past it's range or outlived it's lifetime.
+        """
+        return self.travelled >= self.range or (self.lifetime is not None and self.age >= self.lifetime)
+
 
 class Temp(Projectile):
     """
     Temporary extension of projectile to demonstrate usage
     """
+
+    TEXTURE = "resources/images/monsters/frog/frog1.png"
+
     def __init__(self, *args, **kwargs) -> None:
         super(Temp, self).__init__(*args, **kwargs)
-        self.texture = arcade.load_texture("resources/images/monsters/frog/frog1.png")
+        self.texture = textures.get(self.TEXTURE)
         self.speed = 20
+        self.range = 1200
         self.scale = 1
         # collision list for who/what to collide with: wall, player, enemy
 
     # Can place function for starting on player or enemy
+
+
+class ProjectilePool(object):
+    """
+    Recycles Projectiles, so firing does not create a new Sprite every shot.
+    Every Projectile the pool has made stays in one SpriteList for drawing. Once one expires or hits something it is
+    released, which hides it rather than taking it out of the SpriteList, as removing Sprites from a SpriteList
+    rebuilds it's index. Released Projectiles are launched again for later shots.
+    """
+
+    def __init__(self, kind: Type[Projectile] = Temp) -> None:
+        """
+        Initializes an empty ProjectilePool.
+
+        :param kind: The Projectile class to create when no released Projectile is free.
+        """
+
+        self.kind = kind
+        self.sprites = arcade.SpriteList()
+        # The Projectiles flying, in the order they were fired. Only the keys are used
+        self.flying = {}
+        self.free = []
+
+    def fire(self, start: Tuple[float, float], target: Tuple[float, float]) -> Projectile:
+        """
+        Launches a Projectile, reusing a released one if there is one.
+
+        :param start: The pixel position to fire from.
+        :param target: The pixel position to fire towards.
+        :return: The launched Projectile.
+        """
+
+        if self.free:
+            projectile = self.free.pop()
+            projectile.alpha = 255
+        else:
+            projectile = self.kind()
+            self.sprites.append(projectile)
+        projectile.launch(start, math.atan2(target[1] - start[1], target[0] - start[0]))
+        self.flying[projectile] = None
+        return projectile
+
+    def release(self, projectile: Projectile) -> None:
+        """
+        Hides a Projectile and keeps it for reuse. Does nothing if it was already released.
+        """
+
+        if self.flying.pop(projectile, False) is None:
+            projectile.alpha = 0
+            self.free.append(projectile)
+
+    def update(self) -> List[Projectile]:
+        """
+        Moves every flying Projectile, and releases the ones that have expired.
+
+        :return: The Projectiles still flying.
+        """
+
+        for projectile in list(self.flying):
+            projectile.update()
+            if projectile.expired:
+                self.release(projectile)
+        return list(self.flying)
+
+    def clear(self) -> None:
+        """
+        Releases every flying Projectile.
+        """
+        for projectile in list(self.flying):
+            self.release(projectile)
+
+    def __len__(self) -> int:
+        """
+        :return: The number of Projectiles flying.
+        """
+        return len(self.flying)
+
+
+class BulletSystem(object):
+    """
+    Keeps every flying bullet in NumPy arrays, and moves them and checks their hits all at once.
+    Wall hits are found by looking up the tile under each bullet in the Dungeon's walkable array, and enemy hits
+    by bucketing the enemies from a MobStore. Sprites come from a ProjectilePool, and are only used to draw.
+    """
+
+    # The name and shape of each row of the arrays
+    COLUMNS = (
+        ('positions', (2,)),
+        ('velocities', (2,)),
+        ('speeds', ()),
+        ('travelled', ()),
+        ('ranges', ()),
+        ('ages', ()),
+        # Infinite for bullets without a lifetime
+        ('lifetimes', ()),
+        # Half the width of each bullet, so it can hit an enemy it only grazes
+        ('radii', ()),
+        # The positions at the start of the last tick, to draw bullets part way through their moves
+        ('previous', (2,)),
+    )
+
+    def __init__(self, walkable: np.ndarray, kind: Type[Projectile] = Temp) -> None:
+        """
+        Initializes an empty BulletSystem.
+
+        :param walkable: The Dungeon's walkable array, indexed [x, y].
+        :param kind: The Projectile class fired.
+        """
+
+        self.walls = np.asarray(walkable) == 0
+        self.pool = ProjectilePool(kind)
+        self.sprites = self.pool.sprites
+        # The Projectile drawing each row
+        self.projectiles = []
+        # The bullets on screen, to draw
+        self.visible = ViewList()
+        for name, shape in self.COLUMNS:
+            setattr(self, name, np.zeros((0, *shape)))
+
+    def fire(self, start: Tuple[float, float], target: Tuple[float, float]) -> Projectile:
+        """
+        Launches a bullet.
+
+        :param start: The pixel position to fire from.
+        :param target: The pixel position to fire towards.
+        :return: The Projectile drawing the bullet.
+        """
+        return self.volley(start, [target])[0]
+
+    def volley(self, start: Tuple[float, float], targets: List[Tuple[float, float]]) -> List[Projectile]:
+        """
+        Launches a bullet towards each target at once, growing the arrays once for the whole volley.
+
+        :param start: The pixel position to fire from.
+        :param targets: The pixel positions to fire towards.
+        :return: The Projectiles drawing the bullets, in the order of the targets.
+        """
+
+        projectiles = [self.pool.fire(start, target) for target in targets]
+        positions = [projectile.position for projectile in projectiles]
+        rows = {
+            'positions': positions,
+            'velocities': [(projectile.change_x, projectile.change_y) for projectile in projectiles],
+            'speeds': [projectile.speed for projectile in projectiles],
+            'travelled': [0] * len(projectiles),
+            'ranges': [projectile.range for projectile in projectiles],
+            'ages': [0] * len(projectiles),
+            'lifetimes': [math.inf if projectile.lifetime is None else projectile.lifetime
+                          for projectile in projectiles],
+            'radii': [projectile.width / 2 for projectile in projectiles],
+            'previous': positions,
+        }
+        for name, shape in self.COLUMNS:
+            rows[name] = np.array(rows[name], dtype=float).reshape((-1, *shape))
+            setattr(self, name, np.concatenate([getattr(self, name), rows[name]]))
+        self.projectiles.extend(projectiles)
+        return projectiles
+
+    def in_walls(self) -> np.ndarray:
+        """
+        :return: True for every bullet over a wall tile. Bullets outside of the Dungeon are not in a wall.
+        """
+
+        tiles = tiles_at(self.positions)
+        return tile_lookup(self.walls, tiles[:, 0], tiles[:, 1], False)
+
+    def update(self, store=None) -> List[arcade.Sprite]:
+        """
+        Moves every bullet, and releases the ones that expired, hit a wall or hit an enemy.
+        Each bullet can only hit one enemy, and each enemy is only hit by one bullet.
+
+        :param store: The MobStore of the enemies that bullets can hit.
+        :return: The enemies hit.
+        """
+
+        if not self.projectiles:
+            return []
+        self.positions += self.velocities
+        self.travelled += self.speeds
+        self.ages += 1
+        live = (self.travelled < self.ranges) & (self.ages < self.lifetimes)
+        spent = ~live | self.in_walls()
+
+        hit = []
+        if store is not None and len(store):
+            bullets, enemies = point_hits(self.positions, self.radii, store.positions, store.bounds)
+            keep = live[bullets]
+            bullets, enemies = bullets[keep], enemies[keep]
+            # The first enemy each bullet hit, then the first bullet to hit each enemy
+            first = np.unique(bullets, return_index=True)[1]
+            bullets, enemies = bullets[first], enemies[first]
+            first = np.unique(enemies, return_index=True)[1]
+            bullets, enemies = bullets[first], enemies[first]
+            spent[bullets] = True
+            hit = [store.sprites[index] for index in enemies.tolist()]
+
+        if spent.any():
+            self.remove(spent)
+        self.sync()
+        return hit
+
+    def remove(self, spent: np.ndarray) -> None:
+        """
+        Releases the bullets marked as spent back to the pool, and drops their rows.
+        """
+
+        for index in np.flatnonzero(spent).tolist():
+            self.pool.release(self.projectiles[index])
+        keep = ~spent
+        for name, shape in self.COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.projectiles = [projectile for projectile, kept in zip(self.projectiles, keep.tolist()) if kept]
+
+    def sync(self, alpha: float = 1.0) -> None:
+        """
+        Moves every bullet's Sprite to it's position.
+
+        :param alpha: How far through the last tick to draw each bullet, from 0 at it's previous position
+                      to 1 at it's current position.
+        """
+
+        positions = self.positions if alpha >= 1 else self.previous + (self.positions - self.previous) * alpha
+        for projectile, position in zip(self.projectiles, positions.tolist()):
+            projectile.position = position
+
+    def draw(self, viewport: Tuple[float, float, float, float] = None) -> None:
+        """
+        Draws the bullets on screen, or every bullet if there is no viewport.
+
+        :param viewport: The left, right, bottom and top edges of the area on screen.
+        """
+
+        if viewport is None:
+            self.sprites.draw()
+            return
+        # Bullets may be drawn anywhere between where they started and ended the last tick
+        low = np.minimum(self.previous, self.positions) - self.radii[:, None]
+        high = np.maximum(self.previous, self.positions) + self.radii[:, None]
+        self.visible.update(self.projectiles, in_view(np.hstack([low, high]), viewport))
+        self.visible.draw()
+
+    def clear(self) -> None:
+        """
+        Releases every bullet.
+        """
+        self.remove(np.ones(len(self.projectiles), dtype=bool))
+
+    def __len__(self) -> int:
+        """
+        :return: The number of bullets flying.
+        """
+        return len(self.projectiles)
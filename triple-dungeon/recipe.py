@@ -2,8 +2,14 @@
 Recipes are combinations of three monsters. When a player fills a recipe they get an updgrade
 '''
 
+from itertools import zip_longest
+
 import arcade
 
+from config import Config, SpritePaths
+from hud import screen_space
+from sprites import textures
+
 
 class Recipe:
     '''
@@ -16,41 +22,55 @@ class Recipe:
     FROG_GHOST = ['ghost', 'frog', 'frog']
 
 
-class ActiveRecipe(arcade.SpriteList):
+class ActiveRecipe(object):
     '''
-    Keeps track of the active recipe and draws it.
+    Keeps track of the active recipe and draws it, along with the kills made towards it.
+    Both are drawn in screen space from one SpriteList of fixed slots, which only changes when the recipe or kills do.
     '''
 
+    # The image shown for each monster type
+    ICONS = {'ghost': SpritePaths.GHOST, 'frog': SpritePaths.FROG}
+
     def __init__(self):
-        super().__init__()
         self.active = Recipe.GHOSTS
         self.cycle_recipes = [self.set_ghosts, self.set_frogs, self.set_ggf]
-        self.ghost = arcade.Sprite(filename="resources/images/monsters/ghost/ghost1.png")
-        self.frog = arcade.Sprite(filename="resources/images/monsters/frog/frog1.png")
         self.pos = 0
         self.kill_list = []
+        # The recipe is laid out from the right edge of the screen, and the kills under it from the left
+        self.recipe_slots = [self.slot(Config.SCREEN_WIDTH - 100 - 70 * index, Config.SCREEN_HEIGHT - 80)
+                             for index in range(3)]
+        self.kill_slots = [self.slot(Config.SCREEN_WIDTH - 240 + 70 * index, Config.SCREEN_HEIGHT - 150)
+                           for index in range(3)]
+        self.sprites = arcade.SpriteList()
+        self.sprites.extend(self.recipe_slots + self.kill_slots)
+
+    @staticmethod
+    def slot(x: float, y: float) -> arcade.Sprite:
+        '''
+        :return: A hidden Sprite at a screen position, to show a monster in.
+        '''
 
+        sprite = textures.sprite(SpritePaths.GHOST, 4)
+        sprite.center_x, sprite.center_y = x, y
+        sprite.alpha = 0
+        return sprite
+
+    def refresh(self) -> None:
+        '''
+        Shows the active recipe, read right to left, and the kills so far in the slots. Unused slots are hidden.
+        '''
+
+        for slots, monsters in ((self.recipe_slots, self.active[::-1]), (self.kill_slots, self.kill_list)):
+            for slot, monster in zip_longest(slots, monsters[:len(slots)]):
+                if monster is None:
+                    slot.alpha = 0
+                else:
+                    slot.texture = textures.get(self.ICONS[monster])
+                    slot.alpha = 255
 
     def render(self) -> None:
-        x = 0
-        for sprite in self.sprite_list:
-            screen_right = arcade.get_viewport()[1] - 100
-            screen_top = arcade.get_viewport()[3] - 80
-            sprite.scale = 4
-            sprite.center_x = screen_right - x
-            sprite.center_y = screen_top
-            x += 70
-            sprite.draw()
-        x = 0
-        for kill in self.kill_list:
-            sprite = getattr(self, kill)
-            screen_right = arcade.get_viewport()[1] - 240
-            screen_top = arcade.get_viewport()[3] - 150
-            sprite.scale = 4
-            sprite.center_x = screen_right + x
-            sprite.center_y = screen_top
-            x += 70
-            sprite.draw()
+        with screen_space():
+            self.sprites.draw()
 
     def next_recipe(self):
         self.pos += 1
@@ -67,25 +87,17 @@ class ActiveRecipe(arcade.SpriteList):
                 self.kill_list = []
                 ret_val = self.pos
             self.kill_list = []
+        self.refresh()
         return ret_val
 
     def set_ghosts(self) -> None:
         self.active = Recipe.GHOSTS
-        self.sprite_list = []
-        self.sprite_list.append(self.ghost)
-        self.sprite_list.append(self.ghost)
-        self.sprite_list.append(self.ghost)
-            
+        self.refresh()
+
     def set_frogs(self) -> None:
         self.active = Recipe.FROGS
-        self.sprite_list = []
-        self.sprite_list.append(self.frog)
-        self.sprite_list.append(self.frog)
-        self.sprite_list.append(self.frog)
-        
+        self.refresh()
+
     def set_ggf(self) -> None:
         self.active = Recipe.GHOST_FROG
-        self.sprite_list = []
-        self.sprite_list.append(self.frog)
-        self.sprite_list.append(self.ghost)
-        self.sprite_list.append(self.ghost)
\ No newline at end of file
+        self.refresh()
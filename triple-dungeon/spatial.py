@@ -0,0 +1,208 @@
+"""
+spatial.py
+Broad-phase structures for quickly finding the Sprites near a point or area.
+"""
+
+from typing import List, Tuple
+
+import arcade
+import numpy as np
+
+from config import Config
+
+
+def _bucket_join(keys: np.ndarray, order: np.ndarray, wanted: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs each wanted bucket key with every item in that bucket.
+
+    :param keys: The bucket key of every item, sorted.
+    :param order: The index of the item behind each sorted key.
+    :param wanted: The bucket key to look in for each query.
+    :return: Two arrays of indexes, each pair of entries being a query and an item in it's bucket.
+    """
+
+    first = np.searchsorted(keys, wanted, side='left')
+    counts = np.searchsorted(keys, wanted, side='right') - first
+    total = counts.sum()
+    # Every item in each query's bucket, found by counting along the run of sorted keys
+    runs = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(np.arange(len(wanted)), counts), order[np.repeat(first, counts) + runs]
+
+
+def point_hits(points: np.ndarray, margins: np.ndarray, centers: np.ndarray, bounds: np.ndarray,
+               cell_size: float = Config.TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds every box each point falls inside, for many points and boxes at once.
+    The boxes are sorted into buckets by their centers, and each point is only tested against the boxes in the
+    bucket it is in and the eight around it. Boxes, grown by the margins, must fit within one bucket of their center.
+
+    :param points: The points to test, shaped (n, 2).
+    :param margins: How much to grow the boxes by for each point, so small boxes can be tested as points. Shaped (n,).
+    :param centers: The center of each box, shaped (m, 2).
+    :param bounds: The left, bottom, right and top edges of each box relative to it's center, shaped (m, 4).
+    :param cell_size: The width of each bucket in pixels.
+    :return: Two arrays of indexes, each pair of entries being a point and a box it is inside.
+             Sorted by point, then by box.
+    """
+
+    if not len(points) or not len(centers):
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    box_cells = np.floor(centers / cell_size).astype(np.int64)
+    point_cells = np.floor(points / cell_size).astype(np.int64)
+    # Shift every bucket, and the buckets around each point, into positive keys
+    low = np.minimum(box_cells.min(axis=0), point_cells.min(axis=0)) - 1
+    height = max(box_cells[:, 1].max(), point_cells[:, 1].max()) - low[1] + 2
+
+    def key(cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] - low[0]) * height + (cells[:, 1] - low[1])
+
+    keys = key(box_cells)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+
+    found_points, found_boxes = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            which, boxes = _bucket_join(keys, order, key(point_cells + (dx, dy)))
+            found_points.append(which)
+            found_boxes.append(boxes)
+
+    which, boxes = np.concatenate(found_points), np.concatenate(found_boxes)
+    edges = np.tile(centers[boxes], 2) + bounds[boxes]
+    x, y, margin = points[which, 0], points[which, 1], margins[which]
+    inside = ((x > edges[:, 0] - margin) & (x < edges[:, 2] + margin) &
+              (y > edges[:, 1] - margin) & (y < edges[:, 3] + margin))
+    which, boxes = which[inside], boxes[inside]
+    order = np.lexsort((boxes, which))
+    return which[order], boxes[order]
+
+
+def box_overlaps(centers: np.ndarray, bounds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds every pair of overlapping boxes, for many boxes at once.
+    The boxes are sorted into buckets at least as wide as any box, so two boxes can only overlap when their buckets
+    are the same or neighbours. Each box is only tested against the boxes in it's own bucket and four of the eight
+    around it, so every pair is tested once however the boxes are crowded together.
+
+    :param centers: The center of each box, shaped (n, 2).
+    :param bounds: The left, bottom, right and top edges of each box relative to it's center, shaped (n, 4).
+    :return: Two arrays of box indexes, each pair of entries being two boxes that overlap.
+    """
+
+    if len(centers) < 2:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    cell_size = max(2 * np.abs(bounds).max(), 1)
+    cells = np.floor(centers / cell_size).astype(np.int64)
+    # Shift every bucket, and the buckets around each box, into positive keys
+    low = cells.min(axis=0) - 1
+    height = cells[:, 1].max() - low[1] + 2
+
+    def key(cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] - low[0]) * height + (cells[:, 1] - low[1])
+
+    keys = key(cells)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+
+    firsts, seconds = [], []
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        first, second = _bucket_join(keys, order, key(cells + (dx, dy)))
+        if not dx and not dy:
+            # Pairs within a bucket are found from both of their boxes, keep one of them
+            keep = first < second
+            first, second = first[keep], second[keep]
+        firsts.append(first)
+        seconds.append(second)
+
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    edges = np.tile(centers, 2) + bounds
+    overlap = ((edges[first, 0] < edges[second, 2]) & (edges[second, 0] < edges[first, 2]) &
+               (edges[first, 1] < edges[second, 3]) & (edges[second, 1] < edges[first, 3]))
+    return first[overlap], second[overlap]
+
+
+def tiles_at(coordinates: np.ndarray) -> np.ndarray:
+    """
+    :return: The tile each pixel coordinate falls in, the vectorized form of Mob.nearestPosition().
+    """
+    return np.floor(coordinates / Config.TILE_SIZE + 0.5).astype(int)
+
+
+def tile_lookup(grid: np.ndarray, xs: np.ndarray, ys: np.ndarray, outside) -> np.ndarray:
+    """
+    Reads a value from an array indexed by tile for many tiles at once.
+
+    :param grid: The array to read, indexed [x, y].
+    :param xs: The x of each tile.
+    :param ys: The y of each tile, shaped as xs.
+    :param outside: The value for tiles outside of the grid.
+    :return: The value at each tile, shaped as xs.
+    """
+
+    width, height = grid.shape
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    values = np.full(xs.shape, outside, dtype=grid.dtype)
+    values[inside] = grid[xs[inside], ys[inside]]
+    return values
+
+
+def in_view(edges: np.ndarray, viewport: Tuple[float, float, float, float]) -> np.ndarray:
+    """
+    :param edges: The left, bottom, right and top edges of each box, shaped (n, 4).
+    :param viewport: The left, right, bottom and top edges of the area on screen.
+    :return: True for every box that is at least partly on screen.
+    """
+
+    left, right, bottom, top = viewport
+    return (edges[:, 0] < right) & (edges[:, 2] > left) & (edges[:, 1] < top) & (edges[:, 3] > bottom)
+
+
+class ViewList(object):
+    """
+    A SpriteList holding only the Sprites that are on screen, for drawing, so drawing costs the same however many
+    Sprites are off screen. Sprites are appended as they come into view. When any leave, the list is built again from
+    the Sprites still in view, as each SpriteList.remove rebuilds the list's index and many Sprites can leave at once,
+    like a volley of bullets all reaching their range.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty ViewList.
+        """
+        self.sprites = arcade.SpriteList()
+
+    def update(self, sprites: List[arcade.Sprite], visible: np.ndarray) -> None:
+        """
+        Makes the list hold exactly the visible Sprites.
+
+        :param sprites: Every Sprite that could be drawn.
+        :param visible: True for each of those Sprites that is on screen.
+        """
+
+        shown = [sprites[index] for index in np.flatnonzero(visible).tolist()]
+        kept = set(shown)
+        if any(sprite not in kept for sprite in self.sprites):
+            # Let go of the old list, so moving it's Sprites no longer updates it
+            for sprite in self.sprites:
+                sprite.sprite_lists.remove(self.sprites)
+            self.sprites = arcade.SpriteList()
+            self.sprites.extend(shown)
+            return
+        drawn = set(self.sprites)
+        for sprite in shown:
+            if sprite not in drawn:
+                self.sprites.append(sprite)
+
+    def draw(self) -> None:
+        """
+        Draws the Sprites on screen.
+        """
+        self.sprites.draw()
+
+    def __len__(self) -> int:
+        """
+        :return: The number of Sprites on screen.
+        """
+        return len(self.sprites)
@@ -11,6 +11,70 @@ from typing import Pattern, Iterable
 from itertools import cycle
 
 
+class TextureRegistry(object):
+    """
+    Loads each image once, and hands out the same arcade.Texture for it everywhere it is used.
+    Images are keyed by their absolute path, so different spellings of a path still share one Texture.
+    SpriteLists pack the textures of their Sprites into an atlas by texture name, so sharing Textures also keeps
+    each image in every atlas once.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty TextureRegistry.
+        """
+        self.textures = {}
+
+    def get(self, path: str) -> arcade.Texture:
+        """
+        :param path: The path to an image file.
+        :return: The image's Texture, loading it if this is the first time it was asked for.
+        """
+
+        path = os.path.abspath(path)
+        texture = self.textures.get(path)
+        if texture is None:
+            texture = self.textures[path] = arcade.load_texture(path)
+        return texture
+
+    def sprite(self, path: str, scale: float = 1) -> arcade.Sprite:
+        """
+        :param path: The path to an image file.
+        :param scale: The Sprite's scale.
+        :return: A new Sprite showing the image.
+        """
+
+        sprite = arcade.Sprite(scale=scale)
+        sprite.texture = self.get(path)
+        return sprite
+
+    def preload(self, directory: str) -> int:
+        """
+        Loads every image within a directory and it's subdirectories, so they are not loaded while playing.
+
+        :param directory: The directory to load from.
+        :return: The number of images loaded.
+        """
+
+        count = 0
+        for root, directories, files in os.walk(directory):
+            for file in sorted(files):
+                if file.endswith('.png'):
+                    self.get(os.path.join(root, file))
+                    count += 1
+        return count
+
+    def __len__(self) -> int:
+        """
+        :return: The number of images loaded.
+        """
+        return len(self.textures)
+
+
+# Every Texture the game draws with
+textures = TextureRegistry()
+
+
 class AnimationSet(object):
     """
     A class that helps assist with grabbing new animations from a set.
@@ -41,7 +105,7 @@ class AnimationSet(object):
         # Sort in ascending order based on the connected animation index. Zero-indexing or not does not affect order.
         matches.sort(key=lambda match: int(match.group(1)))
         # Grab the filename and load it to the file directory
-        matches = list(map(lambda match: arcade.load_texture(os.path.join(self.directory, match.group(0))), matches))
+        matches = list(map(lambda match: textures.get(os.path.join(self.directory, match.group(0))), matches))
         return cycle(matches)
 
 
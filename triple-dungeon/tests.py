@@ -31,6 +31,103 @@ class TestGame:
         # test for 100 frames
         game.test(20)
 
+    def test_world_runs_headless(self) -> None:
+        """
+        Tests that a World can be stepped with scripted inputs and no window.
+        """
+        import arcade
+        from world import World
+
+        world = World()
+        world.setup()
+        x, y = world.player.position
+        world.run(120, {
+            0: [('press', arcade.key.D)],
+            10: [('click', x + 500, y)],
+            30: [('release', arcade.key.D), ('press', arcade.key.W)],
+            60: [('press', arcade.key.LSHIFT), ('release', arcade.key.W)],
+        })
+        assert world.ticks == 120 and abs(world.time - 2) < 1e-9
+        assert world.player.position != (x, y)
+        assert world.player.change_x == world.player.change_y == 0
+        world.close()
+
+    def test_restart_with_a_key_held(self) -> None:
+        """
+        Tests that a key held down while the World restarts can still be released afterwards.
+        """
+        import arcade
+        from world import World
+
+        world = World(7, deterministic=True)
+        world.setup()
+        world.step(events=[('press', arcade.key.D)])
+        world.player.health = 0
+        world.step()
+        world.step(events=[('release', arcade.key.D)])
+        assert world.ticks == 3 and world.player.health == world.player.max_health
+        assert not world.prev_keypress and world.player.change_x == 0
+        world.close()
+
+    def test_seeded_worlds_replay(self, tmp_path) -> None:
+        """
+        Tests that deterministic Worlds with the same seed and inputs step the same way, and can be replayed.
+        """
+        import arcade
+        from world import Recording, World
+
+        def state(world: World) -> tuple:
+            return (world.player.position, world.player.health, world.Mobs.store.positions.tolist(),
+                    world.bullets.positions.tolist())
+
+        world = World(1234, deterministic=True)
+        world.setup()
+        x, y = world.player.position
+        world.run(90, {
+            0: [('press', arcade.key.A)],
+            20: [('click', x - 500, y), ('release', arcade.key.A)],
+            40: [('press', arcade.key.S)],
+        })
+        world.recording.save(tmp_path / 'replay.json')
+
+        recording = Recording.load(tmp_path / 'replay.json')
+        assert recording.seed == 1234 and recording.ticks == 90 and len(recording.events) == 4
+        replayed = recording.replay()
+        assert state(replayed) == state(world)
+        world.close()
+        replayed.close()
+
+    def test_interpolation_does_not_change_the_world(self) -> None:
+        """
+        Tests that drawing between ticks puts Sprites part way through their moves, and that ticks are unaffected.
+        """
+        import arcade
+        from world import World
+
+        worlds = [World(99, deterministic=True), World(99, deterministic=True)]
+        for world in worlds:
+            world.setup()
+            world.run(5, {0: [('press', arcade.key.D)]})
+
+        drawn = worlds[0]
+        x1, y1 = drawn.previous[0]
+        x2, y2 = drawn.player.position
+        enemy = drawn.Mobs.store.sprites[0]
+        start, end = drawn.Mobs.store.previous[0].tolist(), drawn.Mobs.store.positions[0].tolist()
+        drawn.interpolate(0.5)
+        assert drawn.player.position == ((x1 + x2) / 2, (y1 + y2) / 2)
+        assert enemy.position == ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+
+        for tick in range(30):
+            for world in worlds:
+                world.step()
+            drawn.interpolate(tick / 30)
+        drawn.settle()
+        assert drawn.player.position == worlds[1].player.position
+        assert drawn.Mobs.store.positions.tolist() == worlds[1].Mobs.store.positions.tolist()
+        for world in worlds:
+            world.close()
+
 
 class TestSprites:
     """
@@ -127,8 +224,754 @@ class TestDungeon:
     Tests the Dungeon class.
     """
 
+    @pytest.fixture
+    def matrix(self) -> List[List[int]]:
+        """
+        :return: A small matrix, indexed [x][y], with a wall splitting it that can only be passed at the top.
+        """
+        return [[1, 1, 1, 1, 1],
+                [1, 1, 1, 1, 1],
+                [0, 0, 0, 0, 1],
+                [1, 1, 1, 1, 1],
+                [1, 1, 1, 1, 1]]
+
+    def test_flow_field(self, matrix) -> None:
+        """
+        Tests that following a FlowField leads to its goal around walls.
+        """
+        import numpy as np
+        from map import FlowField
+
+        field = FlowField(matrix)
+        assert field.update((0, 0))
+        assert not field.update((0, 0))
+
+        position, steps = (4, 0), 0
+        while position != (0, 0):
+            position = field.next_step(position)
+            assert position is not None and matrix[position[0]][position[1]]
+            steps += 1
+        assert steps == 10
+        assert field.next_step((0, 0)) is None
+
+        x, y = field.next_step((4, 0))
+        assert field.directions(np.array([(4, 0), (0, 0), (-1, 3)])).tolist() == [[x - 4, y], [0, 0], [0, 0]]
+
+    def test_tiles_are_batched(self) -> None:
+        """
+        Tests that the Dungeon's static batches hold every Level's tiles.
+        """
+        from map import Dungeon
+
+        dungeon = Dungeon(0, 3)
+        floors = [sprite for level in dungeon.levelList for sprite in level.floorSprites]
+        walls = [sprite for level in dungeon.levelList for sprite in level.wallSprites]
+        assert list(dungeon.floor_list) == floors and list(dungeon.wall_list) == walls
+        assert len(floors) + len(walls) == 9 * 10 * 10
+
+    def test_visible_levels(self) -> None:
+        """
+        Tests that the Levels found on screen are the ones whose tiles overlap the viewport.
+        """
+        import random
+        from config import Config
+        from map import Dungeon
+
+        dungeon = Dungeon(0, 3)
+        rng = random.Random(0)
+        for _ in range(50):
+            left = rng.uniform(-Config.SCREEN_WIDTH, Config.LEVEL_SIZE * 3)
+            bottom = rng.uniform(-Config.SCREEN_HEIGHT, Config.LEVEL_SIZE * 3)
+            right, top = left + Config.SCREEN_WIDTH, bottom + Config.SCREEN_HEIGHT
+            # The area each tile's texture covers, which may be larger than it's hit box
+            expected = [level for level in dungeon.levelList
+                        if any(abs(tile.center_x - (left + right) / 2) < (tile.width + Config.SCREEN_WIDTH) / 2 and
+                               abs(tile.center_y - (bottom + top) / 2) < (tile.height + Config.SCREEN_HEIGHT) / 2
+                               for tile in level.tiles)]
+            assert dungeon.visible_levels((left, right, bottom, top)) == expected
+
+    def test_walkable_matches_levels(self) -> None:
+        """
+        Tests that the walkability array lines up with every Level's structure.
+        """
+        from map import Dungeon
+
+        dungeon = Dungeon(0, 3)
+        assert dungeon.walkable.shape == (30, 30)
+        for level in dungeon.levelList:
+            for x in range(10):
+                for y in range(10):
+                    assert dungeon.walkable[level.x * 10 + x, level.y * 10 + y] == (level.structure[x][y] != 'w')
+
+    def test_distance_transform_matches_a_star(self) -> None:
+        """
+        Tests that the vectorized distance transform agrees with the length of A* paths.
+        """
+        import math
+        import numpy as np
+        from map import Dungeon
+        from path import GridSearch
+
+        from map import FlowField
+
+        dungeon = Dungeon(0, 3)
+        search = GridSearch(dungeon.walkable)
+        goal = tuple(np.argwhere(dungeon.walkable)[0])
+        field = FlowField(dungeon.walkable)
+        field.update(goal)
+
+        for start in map(tuple, np.argwhere(dungeon.walkable)[::7]):
+            path = search(start, goal)
+            length = sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(path, path[1:]))
+            if path:
+                assert field.distance(start) == pytest.approx(length)
+            else:
+                assert math.isinf(field.distance(start))
+
+    def test_flow_field_window(self) -> None:
+        """
+        Tests that a FlowField limited to a window around it's goal still leads to the goal from inside the window.
+        """
+        import numpy as np
+        from map import Dungeon, FlowField
+
+        dungeon = Dungeon(0, 3)
+        tiles = np.argwhere(dungeon.walkable)
+        goal = tuple(tiles[len(tiles) // 2])
+        full, window = FlowField(dungeon.walkable), FlowField(dungeon.walkable, 5)
+        full.update(goal)
+        window.update(goal)
+
+        for start in map(tuple, tiles):
+            if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) > 5:
+                assert np.isinf(window.distance(start)) and window.next_step(start) is None
+            elif np.isfinite(window.distance(start)):
+                assert window.distance(start) >= full.distance(start) - 1e-9
+                position, steps = start, 0
+                while position != goal:
+                    position, steps = window.next_step(position), steps + 1
+                    assert position is not None and steps <= 121
+
+    def test_path_cache(self) -> None:
+        """
+        Tests that the PathCache evicts the least recently used path and counts its lookups.
+        """
+        from map import PathCache
+
+        cache = PathCache(2)
+        cache.put((0, 0), (1, 1), [(0, 0), (1, 1)])
+        cache.put((0, 0), (2, 2), [(0, 0), (1, 1), (2, 2)])
+        assert cache.get((0, 0), (1, 1)) == [(0, 0), (1, 1)]
+        cache.put((0, 0), (3, 3), [])
+
+        assert cache.get((0, 0), (2, 2)) is None
+        assert cache.get((0, 0), (3, 3)) == []
+        assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+    def test_find_path_is_cached(self) -> None:
+        """
+        Tests that repeated searches between the same tiles are answered by the Dungeon's cache.
+        """
+        import numpy as np
+        from map import Dungeon
+
+        dungeon = Dungeon(0, 3)
+        tiles = list(map(tuple, np.argwhere(dungeon.walkable)))
+        path = dungeon.find_path(tiles[0], tiles[-1])
+        assert dungeon.find_path(tiles[0], tiles[-1]) is path
+        assert (dungeon.path_cache.hits, dungeon.path_cache.misses) == (1, 1)
+
+    def test_wall_index_matches_wall_list(self) -> None:
+        """
+        Tests that the WallIndex finds the same wall collisions as checking every wall.
+        """
+        import random
+        import arcade
+        from config import Config
+        from map import Dungeon
+
+        dungeon = Dungeon(0, 3)
+        walls = dungeon.getWalls()
+        sprite = arcade.Sprite('resources/images/monsters/ghost/ghost1.png', 4)
+        rng = random.Random(0)
+        for _ in range(200):
+            sprite.center_x = rng.uniform(-Config.TILE_SIZE, Config.LEVEL_SIZE * 3)
+            sprite.center_y = rng.uniform(-Config.TILE_SIZE, Config.LEVEL_SIZE * 3)
+            expected = arcade.check_for_collision_with_list(sprite, walls)
+            assert set(dungeon.wall_index.collisions(sprite)) == set(expected)
+            assert dungeon.wall_index.overlaps_point(sprite.center_x, sprite.center_y) == any(
+                wall.collides_with_point(sprite.position) for wall in expected)
+
+
+class TestPath:
+    """
+    Tests the pathfinding helpers.
+    """
+
+    @pytest.mark.parametrize('processes', [False, True])
+    def test_path_service(self, processes) -> None:
+        """
+        Tests that background searches find the same paths as searching on the main thread.
+        """
+        import numpy as np
+        from path import GridSearch, PathService
+
+        walkable = np.ones((20, 20), dtype=np.uint8)
+        walkable[10, :18] = 0
+        service = PathService(walkable, workers=2, processes=processes)
+        try:
+            futures = [service.submit((0, y), (19, 19 - y)) for y in range(5)]
+            search = GridSearch(walkable)
+            for y, future in enumerate(futures):
+                assert future.result(timeout=30) == search((0, y), (19, 19 - y))
+        finally:
+            service.shutdown()
+
+    def test_jump_point_search(self) -> None:
+        """
+        Tests that Jump Point Search finds paths of single, valid steps that are as short as A*'s.
+        """
+        import math
+        import numpy as np
+        from path import GridSearch, JumpPointSearch
+
+        rng = np.random.RandomState(0)
+        walkable = (rng.random_sample((25, 25)) > 0.3).astype(np.uint8)
+        jump, flat = JumpPointSearch(walkable), GridSearch(walkable)
+        tiles = list(map(tuple, np.argwhere(walkable)))
+
+        for a, b in rng.randint(len(tiles), size=(50, 2)):
+            path, expected = jump(tiles[a], tiles[b]), flat(tiles[a], tiles[b])
+            assert bool(path) == bool(expected)
+            if path:
+                assert path[0] == tiles[a] and path[-1] == tiles[b]
+                assert all(max(abs(x2 - x1), abs(y2 - y1)) == 1 and walkable[x2, y2]
+                           for (x1, y1), (x2, y2) in zip(path, path[1:]))
+                length = sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(path, path[1:]))
+                assert length == pytest.approx(
+                    sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(expected, expected[1:])))
+
+    def test_hierarchical_search(self) -> None:
+        """
+        Tests that repeatedly following the refined part of hierarchical paths reaches the goal whenever A* can,
+        without any diagonal step cutting past the corner of a wall.
+        """
+        import random
+        import numpy as np
+        from map import Dungeon
+        from path import GridSearch, HierarchicalSearch
+
+        def check_steps(walkable: np.ndarray, path: list) -> tuple:
+            position = path[0]
+            for step, (x, y) in zip(path, path[1:]):
+                if max(abs(x - step[0]), abs(y - step[1])) > 1:
+                    break
+                assert walkable[x, y] and walkable[x, step[1]] and walkable[step[0], y]
+                position = (x, y)
+            return position
+
+        dungeon = Dungeon(0, 4)
+        hierarchical, flat = HierarchicalSearch(dungeon.walkable), GridSearch(dungeon.walkable)
+        tiles = list(map(tuple, np.argwhere(dungeon.walkable)))
+        rng = random.Random(0)
+
+        for _ in range(20):
+            start, end = rng.choice(tiles), rng.choice(tiles)
+            assert bool(hierarchical(start, end)) == bool(flat(start, end))
+            position, searches = start, 0
+            while flat(start, end) and position != end:
+                position = check_steps(dungeon.walkable, hierarchical(position, end))
+                searches += 1
+                assert searches < 50
+
+        # Two entrances of one room that are diagonal neighbours, with a wall on the corner between them
+        walkable = np.ones((20, 20), dtype=np.uint8)
+        walkable[10:, 10:] = walkable[10, :10] = walkable[:10, 10] = walkable[9, 9] = 0
+        walkable[10, 8] = walkable[8, 10] = 1
+        path = HierarchicalSearch(walkable)((15, 5), (5, 15))
+        assert (8, 8) in path and check_steps(walkable, path) == (8, 10)
+
+
+class TestMobs:
+    """
+    Tests the Mob classes and the MobHandler.
+    """
+
+    def test_scheduler_serves_closest_first(self) -> None:
+        """
+        Tests that the AIScheduler serves the closest Enemy first and defers the rest once over budget.
+        """
+        import arcade
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import AIScheduler, Enemy, MobStore
+
+        dungeon = Dungeon(0, 3)
+        tiles = np.argwhere(dungeon.walkable)
+        enemies = arcade.SpriteList()
+        store = MobStore()
+        for index in range(3):
+            enemy = Enemy(dungeon=dungeon, filename='resources/images/monsters/ghost/ghost1.png', scale=4)
+            enemy.center_x, enemy.center_y = tiles[index] * Config.TILE_SIZE
+            store.add(enemy, 'ghost')
+            enemies.append(enemy)
+
+        scheduler = AIScheduler(budget=0)
+        goal = tuple(tiles[-1] * Config.TILE_SIZE)
+        for distance, enemy in zip([300, 100, 200], enemies):
+            scheduler.request(enemy, goal, distance)
+
+        assert scheduler.run() == 1
+        assert enemies[1].path_goal and not enemies[0].path_goal and not enemies[2].path_goal
+        assert scheduler.run() == 1 and scheduler.run() == 1
+        assert enemies[0].path_goal and enemies[2].path_goal and not scheduler.requests
+        dungeon.close()
+
+    def test_activation_pass(self) -> None:
+        """
+        Tests that one activation pass hurts the player once per touching enemy, and sorts enemies into AI tiers.
+        """
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import MobHandler, MobStore, Player
+        from spatial import tiles_at
+
+        dungeon = Dungeon(0, 3)
+        player = Player(dungeon=dungeon)
+        # An open tile with open tiles above it and along it's right, so every nearby enemy stands on a floor
+        x, y = next((x, y) for x, y in np.argwhere(dungeon.walkable[:-2, :-1])
+                    if dungeon.walkable[x:x + 3, y].all() and dungeon.walkable[x, y + 1])
+        player.center_x, player.center_y = x * Config.TILE_SIZE, y * Config.TILE_SIZE
+        handler = MobHandler()
+        handler.setup(2, 2, player, dungeon)
+        handler.store.positions[:] = np.array(player.position) + [[50, 0], [0, 80], [450, 0], [5000, 5000]]
+
+        health = player.health
+        handler.activate()
+        assert player.health == health - 2 * (2 - player.armor)
+        assert handler.store.tiers.tolist() == [MobStore.FULL, MobStore.FULL, MobStore.REDUCED, MobStore.DORMANT]
+        assert handler.store.states.tolist() == [MobStore.CHASE] * 3 + [MobStore.IDLE]
+        steps = dungeon.flow_field.directions(tiles_at(handler.store.positions[:2]))
+        assert (handler.store.velocities[:2] == steps * Config.MONSTER_MOVEMENT_SPEED).all()
+        assert np.abs(handler.store.velocities[3]).sum() == 0
+
+        # The reduced tier enemy is only steered once every AI_REDUCED_INTERVAL frames
+        steered = 0
+        for _ in range(Config.AI_REDUCED_INTERVAL):
+            handler.store.velocities[2] = -1
+            handler.activate()
+            steered += bool((handler.store.velocities[2] != -1).any())
+        assert steered == 1
+        dungeon.close()
+
+    def test_chaser_reaches_the_player_around_a_corner(self) -> None:
+        """
+        Tests that an enemy chasing along a row, off to the side of it's tile, gets around a corner to the player
+        instead of catching on the wall.
+        """
+        import random
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import MobHandler, PhysicsEngine, Player
+
+        dungeon = Dungeon(0, 3, random.Random(0), 0)
+        walkable = dungeon.walkable
+        # A corner at (x, y): a corridor running right from it, and the player two tiles up it, past a wall
+        x, y = next((x, y) for x, y in np.argwhere(walkable[:-2, :-2])
+                    if walkable[x:x + 3, y].all() and walkable[x, y + 1:y + 3].all() and
+                    not walkable[x + 1:x + 3, y + 1].any())
+        player = Player(dungeon=dungeon)
+        player.center_x, player.center_y = x * Config.TILE_SIZE, (y + 2) * Config.TILE_SIZE
+        player.collisions = PhysicsEngine(player, dungeon.wall_index)
+        handler = MobHandler(rng=random.Random(0), budget=None)
+        handler.setup(1, 0, player, dungeon)
+        # Near the top of it's tile, so it's box reaches into the row with the wall
+        handler.store.positions[0] = ((x + 2) * Config.TILE_SIZE, y * Config.TILE_SIZE + 40)
+
+        for _ in range(200):
+            handler.update((0, 10 ** 6, 0, 10 ** 6))
+            if np.hypot(*(handler.store.positions[0] - player.position)) < 100:
+                break
+        assert np.hypot(*(handler.store.positions[0] - player.position)) < 100
+        dungeon.close()
+
+    def test_physics_engine_stops_at_walls(self) -> None:
+        """
+        Tests that a Mob running into a wall is stopped against it, and can still slide along it.
+        """
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import Enemy, PhysicsEngine
+
+        dungeon = Dungeon(0, 3)
+        # An open tile with a wall directly to it's right
+        x, y = next((x, y) for x, y in np.argwhere(dungeon.walkable[:-1])
+                    if not dungeon.walkable[x + 1, y] and dungeon.walkable[x, y + 1])
+        enemy = Enemy(dungeon=dungeon, filename='resources/images/monsters/ghost/ghost1.png', scale=4)
+        enemy.center_x, enemy.center_y = x * Config.TILE_SIZE, y * Config.TILE_SIZE
+        engine = PhysicsEngine(enemy, dungeon.wall_index)
+
+        enemy.change_x, enemy.change_y = Config.MONSTER_MOVEMENT_SPEED, 1
+        for _ in range(20):
+            engine.update()
+        assert not dungeon.wall_index.collisions(enemy)
+        assert enemy.right < (x + 0.5) * Config.TILE_SIZE
+        assert enemy.center_y == y * Config.TILE_SIZE + 20
+
+    def test_mob_physics_stops_at_walls_and_bodies(self) -> None:
+        """
+        Tests that a batched MobPhysics step stops Mobs against wall tiles, and that Mobs do not walk into each other.
+        """
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import MobPhysics
+        from spatial import box_overlaps
+
+        dungeon = Dungeon(0, 3)
+        physics = MobPhysics(dungeon.walkable)
+        x, y = next((x, y) for x, y in np.argwhere(dungeon.walkable[:-1])
+                    if not dungeon.walkable[x + 1, y] and dungeon.walkable[x, y + 1])
+        bounds = np.array([[-28.0, -26.0, 28.0, 26.0]])
+        positions = np.array([[x, y]], dtype=float) * Config.TILE_SIZE
+        for _ in range(20):
+            physics.step(positions, np.array([[Config.MONSTER_MOVEMENT_SPEED, 1.0]]), bounds)
+        assert positions[0, 0] + bounds[0, 2] < (x + 0.5) * Config.TILE_SIZE
+        assert positions[0, 1] == y * Config.TILE_SIZE + 20
+
+        # Two Mobs walking into each other with no walls around, and a third standing still between them
+        physics = MobPhysics(np.ones((10, 10)))
+        bounds = np.repeat(bounds, 2, axis=0)
+        positions = np.array([[300.0, 300.0], [500.0, 300.0]])
+        obstacle = np.array([[400.0, 360.0]])
+        for _ in range(20):
+            physics.step(positions, np.array([[5.0, 2.0], [-5.0, 2.0]]), bounds, obstacle, bounds[:1])
+        everything = np.concatenate([positions, obstacle])
+        assert len(box_overlaps(everything, np.concatenate([bounds, bounds[:1]]))[0]) == 0
+        assert positions[0, 0] > 300 and positions[1, 0] < 500
+
+    def test_mob_store(self) -> None:
+        """
+        Tests that Enemies stay views over the right MobStore rows as others are removed.
+        """
+        import numpy as np
+        from map import Dungeon
+        from mobs import Enemy, MobStore
+
+        dungeon = Dungeon(0, 3)
+        store = MobStore()
+        enemies = []
+        for index, kind in enumerate(['ghost', 'frog', 'ghost', 'frog']):
+            enemy = Enemy(dungeon=dungeon, filename='resources/images/monsters/ghost/ghost1.png', scale=4)
+            enemy.center_x, enemy.center_y = index * 100, 0
+            store.add(enemy, kind)
+            enemy.health = index
+            enemies.append(enemy)
+
+        store.remove(enemies[1])
+        assert len(store) == 3 and enemies[1].store is None
+        assert [enemy.health for enemy in store.sprites] == [0, 3, 2]
+        assert [enemy.monster_type for enemy in store.sprites] == ['ghost', 'frog', 'ghost']
+        assert np.allclose(store.distances((0, 0)), [0, 300, 200])
+
+        store.positions[enemies[3].index] = (50, 60)
+        store.sync()
+        assert enemies[3].position == (50, 60)
+
+
+class TestSpatial:
+    """
+    Tests the broad-phase structures.
+    """
+
+    def test_box_overlaps_matches_brute_force(self) -> None:
+        """
+        Tests that bucketed box overlaps find exactly the pairs a full check of every box against every other does,
+        including when every box is crowded into a single column.
+        """
+        import numpy as np
+        from spatial import box_overlaps
+
+        def brute_force(centers: np.ndarray, bounds: np.ndarray) -> set:
+            edges = np.tile(centers, 2) + bounds
+            overlap = ((edges[:, None, 0] < edges[None, :, 2]) & (edges[None, :, 0] < edges[:, None, 2]) &
+                       (edges[:, None, 1] < edges[None, :, 3]) & (edges[None, :, 1] < edges[:, None, 3]))
+            return {(first, second) for first, second in np.argwhere(np.triu(overlap, 1)).tolist()}
+
+        rng = np.random.RandomState(0)
+        bounds = np.tile([-28.0, -26.0, 28.0, 26.0], (400, 1))
+        scattered = rng.uniform(-200, 1000, (400, 2))
+        column = np.column_stack([rng.uniform(0, 40, 400), rng.uniform(0, 20000, 400)])
+        for centers in (scattered, column):
+            first, second = box_overlaps(centers, bounds)
+            found = {(min(pair), max(pair)) for pair in zip(first.tolist(), second.tolist())}
+            assert len(found) == len(first) and found == brute_force(centers, bounds)
+
+    def test_view_list_follows_the_viewport(self) -> None:
+        """
+        Tests that a ViewList holds exactly the Sprites whose boxes are on screen as the view moves.
+        """
+        import arcade
+        import numpy as np
+        from spatial import ViewList, in_view
+
+        rng = np.random.RandomState(0)
+        sprites = [arcade.Sprite('resources/images/monsters/ghost/ghost1.png', 2) for _ in range(100)]
+        centers = rng.uniform(0, 2000, size=(100, 2))
+        edges = np.hstack([centers - 20, centers + 20])
+        view = ViewList()
+        for left, bottom in ((0, 0), (400, 300), (1900, 1900), (400, 300)):
+            viewport = (left, left + 500, bottom, bottom + 400)
+            view.update(sprites, in_view(edges, viewport))
+            expected = [sprite for sprite, (x1, y1, x2, y2) in zip(sprites, edges)
+                        if x1 < left + 500 and x2 > left and y1 < bottom + 400 and y2 > bottom]
+            assert set(view.sprites) == set(expected) and len(view) == len(expected)
+
+    def test_view_list_drops_many_sprites_at_once(self) -> None:
+        """
+        Tests that thousands of Sprites leaving the view at once are dropped by building a new list, which holds
+        exactly the Sprites still in view, and that every Sprite forgets the old list.
+        """
+        import arcade
+        import numpy as np
+        from spatial import ViewList
+
+        sprites = [arcade.Sprite() for _ in range(5000)]
+        view = ViewList()
+        view.update(sprites, np.ones(len(sprites), dtype=bool))
+        old = view.sprites
+        view.update(sprites, np.arange(len(sprites)) < 10)
+        assert view.sprites is not old and list(view.sprites) == sprites[:10]
+        assert all(old not in sprite.sprite_lists for sprite in sprites)
+        assert all(sprite.sprite_lists == [view.sprites] for sprite in sprites[:10])
+        assert not any(sprite.sprite_lists for sprite in sprites[10:])
+
+    def test_point_hits_matches_brute_force(self) -> None:
+        """
+        Tests that bucketed point hits find exactly the boxes a full check of every point against every box does.
+        """
+        import numpy as np
+        from spatial import point_hits
+
+        rng = np.random.RandomState(0)
+        points, margins = rng.uniform(-200, 1000, (500, 2)), rng.uniform(0, 10, 500)
+        centers = rng.uniform(-200, 1000, (80, 2))
+        bounds = np.tile([-28.0, -26.0, 28.0, 26.0], (80, 1))
+
+        edges = np.tile(centers, 2) + bounds
+        expected = np.argwhere((points[:, None, 0] > edges[None, :, 0] - margins[:, None]) &
+                               (points[:, None, 0] < edges[None, :, 2] + margins[:, None]) &
+                               (points[:, None, 1] > edges[None, :, 1] - margins[:, None]) &
+                               (points[:, None, 1] < edges[None, :, 3] + margins[:, None]))
+        which, boxes = point_hits(points, margins, centers, bounds, 100)
+        assert len(expected) and np.column_stack([which, boxes]).tolist() == expected.tolist()
+
+    def test_tile_lookup(self) -> None:
+        """
+        Tests that pixel coordinates round to the nearest tile, and that tiles outside of a grid read as the default.
+        """
+        import numpy as np
+        from config import Config
+        from spatial import tile_lookup, tiles_at
+
+        half = Config.TILE_SIZE / 2
+        assert tiles_at(np.array([0, half - 1, half, -half - 1, 3 * Config.TILE_SIZE])).tolist() == [0, 0, 1, -1, 3]
+        grid = np.arange(6).reshape(2, 3)
+        xs, ys = np.array([0, 1, -1, 2, 1]), np.array([2, 0, 0, 1, 3])
+        assert tile_lookup(grid, xs, ys, -1).tolist() == [2, 3, -1, -1, -1]
+        assert tile_lookup(grid == 4, xs[:, None], ys[:, None], False).shape == (5, 1)
+
+
+class TestProjectiles:
+    """
+    Tests projectiles and their pool.
+    """
+
+    def test_projectile_pool(self) -> None:
+        """
+        Tests that Projectiles expire once past their range and are reused for later shots.
+        """
+        from projectiles import ProjectilePool, Temp
+
+        pool = ProjectilePool(Temp)
+        first = pool.fire((0, 0), (100, 0))
+        assert first.change_x == first.speed and first.change_y == 0
+        for _ in range(first.range // first.speed - 1):
+            assert pool.update() == [first]
+        assert pool.update() == [] and len(pool) == 0
+        assert first.center_x == first.range
+
+        second = pool.fire((0, 0), (0, -100))
+        assert second is first and second.center_x == 0 and second.travelled == 0
+        assert second.texture is Temp().texture
+        pool.release(second)
+        pool.release(second)
+        assert len(pool) == 0 and pool.free == [second]
+
+    def test_bullet_system(self) -> None:
+        """
+        Tests that bullets stop at walls, and that a volley kills each enemy it hits once.
+        """
+        import numpy as np
+        from config import Config
+        from map import Dungeon
+        from mobs import Enemy, MobStore
+        from projectiles import BulletSystem
+
+        dungeon = Dungeon(0, 3)
+        bullets = BulletSystem(dungeon.walkable)
+        # An open tile with a wall directly to it's right
+        x, y = next((x, y) for x, y in np.argwhere(dungeon.walkable[:-1]) if not dungeon.walkable[x + 1, y])
+        start = (x * Config.TILE_SIZE, y * Config.TILE_SIZE)
+        bullets.fire(start, (start[0] + 100, start[1]))
+        for _ in range(Config.TILE_SIZE // 20 + 1):
+            bullets.update()
+        assert len(bullets) == 0 and len(bullets.pool.free) == 1
+
+        store = MobStore()
+        enemy = Enemy(dungeon=dungeon, filename='resources/images/monsters/ghost/ghost1.png', scale=4)
+        enemy.center_x, enemy.center_y = 100000, 100000
+        store.add(enemy, 'ghost')
+        for offset in range(3):
+            bullets.fire((100000 - 30 + offset, 100000), (100010, 100000))
+        bullets.fire((100000, 90000), (100000, 0))
+        assert bullets.update(store) == [enemy]
+        assert len(bullets) == 3 and bullets.projectiles[-1].center_y == 90000 - 20
+        store.remove(enemy)
+        assert bullets.update(store) == [] and len(bullets) == 3
+        dungeon.close()
+
+    def test_bullet_volley(self) -> None:
+        """
+        Tests that a volley fires the same bullets as firing them one at a time.
+        """
+        import numpy as np
+        from projectiles import BulletSystem
+
+        targets = [(100, 0), (0, -100), (-30, 40)]
+        single, volley = BulletSystem(np.ones((10, 10))), BulletSystem(np.ones((10, 10)))
+        for target in targets:
+            single.fire((0, 0), target)
+        projectiles = volley.volley((0, 0), targets)
+        assert projectiles == volley.projectiles and len(volley) == 3
+        for name, shape in BulletSystem.COLUMNS:
+            assert getattr(volley, name).shape == (3, *shape)
+            assert np.array_equal(getattr(volley, name), getattr(single, name))
+        assert volley.volley((0, 0), []) == [] and len(volley) == 3
+
 
 class TestMisc:
     """
     Tests things that don't fit anywhere else.
     """
+
+    def test_hud_only_redraws_changed_text(self) -> None:
+        """
+        Tests that the HUD's text is only made again when a stat changes, and reused when a stat changes back.
+        """
+        from hud import HUD
+        from map import Dungeon
+        from mobs import Player
+
+        player = Player(Dungeon(0, 1))
+        hud = HUD()
+        assert hud.update(player) and hud.health.text == f'Health:{player.health}/{player.max_health}'
+        texture = hud.health.texture
+        assert not hud.update(player)
+
+        player.health -= 10
+        assert hud.update(player) and hud.health.texture is not texture
+        armor = hud.armor.texture
+        player.health += 10
+        assert hud.update(player) and hud.health.texture is texture and hud.armor.texture is armor
+        assert hud.health.left == 100 and hud.health.bottom == 60
+        hud.health.place(300, 200)
+        assert hud.health.left == 300 and hud.health.bottom == 200 and hud.health.texture is texture
+
+    def test_recipe_slots_follow_state(self) -> None:
+        """
+        Tests that the recipe's slots show the active recipe and the kills, without adding or removing Sprites.
+        """
+        from config import SpritePaths
+        from recipe import ActiveRecipe
+        from sprites import textures
+
+        ghost, frog = textures.get(SpritePaths.GHOST), textures.get(SpritePaths.FROG)
+        recipe = ActiveRecipe()
+        recipe.set_ghosts()
+        sprites = list(recipe.sprites)
+
+        def shown(slots) -> list:
+            return [slot.texture if slot.alpha else None for slot in slots]
+
+        assert shown(recipe.recipe_slots) == [ghost] * 3 and shown(recipe.kill_slots) == [None] * 3
+        recipe.next_recipe()
+        recipe.next_recipe()
+        assert recipe.active == ['ghost', 'ghost', 'frog'] and shown(recipe.recipe_slots) == [frog, ghost, ghost]
+        assert recipe.add_kill('ghost') == -1 and recipe.add_kill('frog') == -1
+        assert shown(recipe.kill_slots) == [ghost, frog, None]
+        assert recipe.add_kill('frog') == -1 and shown(recipe.kill_slots) == [None] * 3
+        assert list(recipe.sprites) == sprites
+
+    def test_texture_registry(self) -> None:
+        """
+        Tests that every image is loaded once, and shared by the Sprites made from it.
+        """
+        import os
+        from config import IMAGES, SpritePaths
+        from map import Level
+        from sprites import TextureRegistry, textures
+
+        registry = TextureRegistry()
+        assert registry.preload(os.path.join(IMAGES, 'monsters')) == len(registry) > 0
+        assert registry.get('resources/images/monsters/ghost/ghost1.png') is registry.get(SpritePaths.GHOST)
+        assert registry.sprite(SpritePaths.FROG, 4).texture is registry.get(SpritePaths.FROG)
+
+        level = Level.load_file(0, 0)
+        assert len({id(tile.texture) for tile in level.tiles}) == len({tile.texture.name for tile in level.tiles})
+        shared = {id(texture) for texture in textures.textures.values()}
+        assert all(id(tile.texture) in shared for tile in level.tiles)
+
+    def test_frame_profiler(self, tmp_path) -> None:
+        """
+        Tests that the FrameProfiler adds up phases within a frame, and exports every frame kept.
+        """
+        import csv
+        import time
+        from profiler import FrameProfiler
+
+        profiler = FrameProfiler(window=10, history=5)
+        for frame in range(8):
+            for _ in range(2):
+                with profiler.phase('mobs'):
+                    time.sleep(0.001)
+            profiler.end_frame()
+
+        p50, p95, p99 = profiler.percentiles('mobs')
+        assert 2 <= p50 <= p95 <= p99 <= profiler.percentiles('frame')[2]
+        assert profiler.percentiles('hud') == (0, 0, 0)
+
+        profiler.write_csv(tmp_path / 'profile.csv')
+        with open(tmp_path / 'profile.csv') as file:
+            rows = list(csv.DictReader(file))
+        assert [int(row['number']) for row in rows] == [3, 4, 5, 6, 7]
+        assert all(float(row['mobs']) >= 2 for row in rows)
+
+        # Time spent in a phase nested inside another only counts towards the inner phase
+        profiler = FrameProfiler()
+        with profiler.phase('mobs'):
+            with profiler.phase('pathfinding'):
+                time.sleep(0.005)
+        assert profiler.current['pathfinding'] >= 0.005 > profiler.current['mobs']
+
+        # The drawn table keeps one Label per row, and only makes new text for rows that changed
+        profiler.update_table(20, 500)
+        header = profiler.labels[0].texture
+        profiler.end_frame()
+        profiler.update_table(20, 500)
+        assert len(profiler.table) == len(profiler.PHASES) + 2 and profiler.labels[0].texture is header
+        assert profiler.labels[1].text.startswith('mobs') and profiler.labels[1].top <= 480
@@ -0,0 +1,384 @@
+"""
+world.py
+Holds the game's simulation, separate from the window that draws it.
+A World can be set up and stepped without a display, for tests, bots and load testing.
+Seeded Worlds can record their inputs, and be replayed from a Recording tick for tick.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from typing import Dict, Iterable, List, Tuple
+
+import arcade
+
+from config import Config
+from map import Dungeon
+from mobs import Player, MobHandler, PhysicsEngine
+from profiler import FrameProfiler
+from projectiles import BulletSystem
+from recipe import ActiveRecipe
+
+# An input to the World: ('press', key), ('release', key) or ('click', x, y) with x and y in world pixels
+Event = Tuple
+
+
+class World(object):
+    """
+    The dungeon, player, enemies, bullets and recipes, and everything that happens to them each tick.
+    Nothing here draws or needs an OpenGL context. Game draws a World and feeds it the player's inputs,
+    while scripted inputs can be fed to it directly.
+    """
+
+    def __init__(self, seed: int = Config.SEED, deterministic: bool = Config.DETERMINISTIC) -> None:
+        """
+        Initializes an empty World. Call setup() before stepping it.
+
+        :param seed: Seeds the dungeon, spawns and enemy wandering. None picks a new seed.
+        :param deterministic: Search for paths on the main thread and serve every path request each tick,
+                              so that stepping depends only on the seed and the inputs, not on timing.
+        """
+
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.deterministic = deterministic
+        self.rng = random.Random(self.seed)
+        # Every input handled, so the World can be replayed
+        self.recording = Recording(self.seed, deterministic)
+
+        self.dungeon = None
+        self.player = None
+        self.Mobs = None
+        self.enemy_list = None
+        self.active_enemies = []
+        self.bullets = None
+        self.Recipe = None
+        self.prev_keypress = []  # A list that assists with tracking keypress events
+        # Used to keep track of our scrolling
+        self.view_bottom = self.view_left = 0
+        # The number of ticks stepped, and the total time they covered
+        self.ticks = 0
+        self.time = 0.0
+        # The player's position and the viewport at the start of the last tick, to draw between ticks
+        self.previous = None
+        # The player's position and the viewport while they are moved for drawing between ticks
+        self.exact = None
+        # Times each phase of every frame. Frames are ended by whatever steps the World
+        self.profiler = FrameProfiler()
+
+    def setup(self) -> None:
+        """
+        Creates a new dungeon and populates it. Call this function to restart the game.
+        """
+
+        # Create the dungeon, stopping the previous one's pathfinding workers
+        if self.dungeon is not None:
+            self.dungeon.close()
+        self.dungeon = Dungeon(0, 3, self.rng, 0 if self.deterministic else Config.PATH_WORKERS)
+        self.bullets = BulletSystem(self.dungeon.walkable)
+
+        # Set up recipes
+        self.Recipe = ActiveRecipe()
+        self.Recipe.set_ghosts()
+
+        # Set up the player, specifically placing it at these coordinates.
+        self.player = Player(self.dungeon)
+        self.player.scale = 1
+        level = self.rng.choice(self.dungeon.levelList)
+        self.player.center_x, self.player.center_y = level.center()
+        self.player.cur_recipe = self.Recipe.active
+        self.player.collisions = PhysicsEngine(self.player, self.dungeon.wall_index)
+        self.previous = self.exact = None
+
+        # Set up monsters
+        self.Mobs = MobHandler(self.profiler, random.Random(self.rng.randrange(2 ** 32)),
+                               None if self.deterministic else Config.PATHFINDING_BUDGET_MS)
+        self.enemy_list = self.Mobs.setup(Config.MONSTER_COUNT, Config.MONSTER_COUNT, self.player, self.dungeon)
+
+        # Setup viewport
+        self.view_bottom = self.player.center_x - (0.5 * Config.SCREEN_WIDTH) + 300
+        self.view_left = self.player.center_x - (0.5 * Config.SCREEN_WIDTH)
+
+    @property
+    def bullet_list(self) -> arcade.SpriteList:
+        """
+        :return: The Sprite of every bullet the pool has made, including the hidden ones released for reuse.
+        """
+        return self.bullets.sprites
+
+    @property
+    def viewport(self) -> Tuple[float, float, float, float]:
+        """
+        :return: The left, right, bottom and top edges of the area shown on screen, in world pixels.
+        """
+        return (self.view_left, self.view_left + Config.SCREEN_WIDTH,
+                self.view_bottom, self.view_bottom + Config.SCREEN_HEIGHT)
+
+    def press(self, key: int) -> None:
+        """
+        Handles a key being pressed.
+        """
+
+        if key == arcade.key.UP or key == arcade.key.W:
+            self.player.change_y = self.player.speed
+            self.prev_keypress.append(key)
+        elif key == arcade.key.DOWN or key == arcade.key.S:
+            self.player.change_y = -self.player.speed
+            self.prev_keypress.append(key)
+        elif key == arcade.key.LEFT or key == arcade.key.A:
+            self.player.change_x = -self.player.speed
+            self.prev_keypress.append(key)
+        elif key == arcade.key.RIGHT or key == arcade.key.D:
+            self.player.change_x = self.player.speed
+            self.prev_keypress.append(key)
+        elif key == arcade.key.LSHIFT:
+            self.Recipe.next_recipe()
+            self.player.cur_recipe = self.Recipe.active
+
+    def release(self, key: int) -> None:
+        """
+        Handles a key being released.
+        """
+
+        if key == arcade.key.UP or key == arcade.key.W:
+            self.player.change_y = 0
+            self.prev_keypress.remove(key)
+        elif key == arcade.key.DOWN or key == arcade.key.S:
+            self.player.change_y = 0
+            self.prev_keypress.remove(key)
+        elif key == arcade.key.LEFT or key == arcade.key.A:
+            self.player.change_x = 0
+            self.prev_keypress.remove(key)
+        elif key == arcade.key.RIGHT or key == arcade.key.D:
+            self.player.change_x = 0
+            self.prev_keypress.remove(key)
+
+        if self.prev_keypress:
+            self.press(self.prev_keypress.pop(0))
+
+    def click(self, x: float, y: float) -> None:
+        """
+        Handles the mouse being clicked, firing a bullet from the player.
+
+        :param x: The x position clicked, in world pixels.
+        :param y: The y position clicked, in world pixels.
+        """
+
+        # Fire a bullet TEMP SPRITE from the player towards the mouse, currently wielding frog slingshot
+        self.bullets.fire(self.player.position, (x, y))
+
+    def apply(self, event: Event) -> None:
+        """
+        Handles a scripted input.
+
+        :param event: ('press', key), ('release', key) or ('click', x, y).
+        """
+
+        kind, *args = event
+        {'press': self.press, 'release': self.release, 'click': self.click}[kind](*args)
+
+    def step(self, delta_time: float = 1 / Config.TICK_RATE, events: Iterable[Event] = ()) -> None:
+        """
+        Advances the World by one tick. Everything moves a fixed amount each tick, whatever delta_time is.
+
+        :param delta_time: The time the tick covers, in seconds.
+        :param events: Inputs to handle before the tick.
+        """
+
+        self.settle()
+        for event in events:
+            self.recording.record(self.ticks, event)
+            self.apply(event)
+
+        if self.player.health == 0:
+            self.setup()
+        if len(self.enemy_list) == 0 and len(self.active_enemies) == 0:
+            self.setup()
+
+        # Remember where everything starts the tick, to draw them moving through it
+        self.previous = (self.player.position, self.view_left, self.view_bottom)
+        self.Mobs.store.previous[:] = self.Mobs.store.positions
+        self.bullets.previous[:] = self.bullets.positions
+
+        # Update Mobs
+        self.Mobs.update(self.viewport)
+
+        # scroll screen
+        with self.profiler.phase('scroll'):
+            self.scroll()
+
+        # Projectile updates, every bullet is moved and checked for hits at once
+        with self.profiler.phase('bullets'):
+            hits = self.bullets.update(self.Mobs.store)
+        for enemy in hits:
+            boon = self.Recipe.add_kill(enemy.monster_type)
+            if boon >= 0:
+                getattr(self.player, Config.BOON_LIST[boon])()
+            self.Mobs.kill(enemy)
+
+        self.ticks += 1
+        self.time += delta_time
+        self.recording.ticks = self.ticks
+
+    def run(self, ticks: int, script: Dict[int, List[Event]] = None, delta_time: float = 1 / Config.TICK_RATE) -> None:
+        """
+        Steps the World many times, as fast as it can.
+
+        :param ticks: The number of ticks to step.
+        :param script: Maps tick numbers, counted from the start of this run, to the inputs to handle on them.
+        :param delta_time: The time each tick covers, in seconds.
+        """
+
+        script = script or {}
+        for tick in range(ticks):
+            self.step(delta_time, script.get(tick, ()))
+            self.profiler.end_frame()
+
+    def interpolate(self, alpha: float) -> None:
+        """
+        Moves the player, enemies, bullets and viewport part way between where they were before and after the last tick,
+        for drawing between ticks. Everything is put back before the next tick, so drawing never changes the game.
+
+        :param alpha: How far through the last tick to draw, from 0 to 1.
+        """
+
+        self.settle()
+        if self.previous is None:
+            return
+        self.exact = (self.player.position, self.view_left, self.view_bottom)
+        (x1, y1), left1, bottom1 = self.previous
+        (x2, y2), left2, bottom2 = self.exact
+        self.player.position = (x1 + (x2 - x1) * alpha, y1 + (y2 - y1) * alpha)
+        # Only scroll to integers, like scroll()
+        self.view_left = int(left1 + (left2 - left1) * alpha)
+        self.view_bottom = int(bottom1 + (bottom2 - bottom1) * alpha)
+        self.Mobs.store.sync(alpha)
+        self.bullets.sync(alpha)
+
+    def settle(self) -> None:
+        """
+        Puts back everything moved by interpolate().
+        """
+
+        if self.exact is None:
+            return
+        self.player.position, self.view_left, self.view_bottom = self.exact
+        self.exact = None
+        self.Mobs.store.sync()
+        self.bullets.sync()
+
+    def scroll(self) -> bool:
+        """
+        Moves the viewport to keep the player within it's margins.
+
+        :return: True if the viewport moved.
+        """
+
+        changed = False  # Track if we need to change the viewport
+        # Scroll left
+        left_boundary = self.view_left + Config.LEFT_VIEWPORT_MARGIN
+        if self.player.left < left_boundary:
+            self.view_left -= left_boundary - self.player.left
+            changed = True
+        # Scroll right
+        right_boundary = self.view_left + Config.SCREEN_WIDTH - Config.RIGHT_VIEWPORT_MARGIN
+        if self.player.right > right_boundary:
+            self.view_left += self.player.right - right_boundary
+            changed = True
+        # Scroll up
+        top_boundary = self.view_bottom + Config.SCREEN_HEIGHT - Config.TOP_VIEWPORT_MARGIN
+        if self.player.top > top_boundary:
+            self.view_bottom += self.player.top - top_boundary
+            changed = True
+        # Scroll down
+        bottom_boundary = self.view_bottom + Config.BOTTOM_VIEWPORT_MARGIN
+        if self.player.bottom < bottom_boundary:
+            self.view_bottom -= bottom_boundary - self.player.bottom
+            changed = True
+
+        if changed:
+            # Only scroll to integers. Otherwise we end up with pixels that
+            # don't line up on the screen
+            self.view_bottom = int(self.view_bottom)
+            self.view_left = int(self.view_left)
+        return changed
+
+    def close(self) -> None:
+        """
+        Stops the World's background pathfinding workers.
+        """
+        if self.dungeon is not None:
+            self.dungeon.close()
+
+
+class Recording(object):
+    """
+    The seed of a World and every input it handled, by the tick it was handled on.
+    Replaying a Recording steps a new World with the same seed through the same inputs. Recordings of deterministic
+    Worlds replay exactly, others may drift as their path searches finish on different ticks.
+    """
+
+    def __init__(self, seed: int, deterministic: bool = True, events: List[Tuple[int, Event]] = None,
+                 ticks: int = 0) -> None:
+        """
+        Initializes a Recording.
+
+        :param seed: The seed of the World recorded.
+        :param deterministic: Whether the World recorded was deterministic.
+        :param events: Each input recorded, with the tick it was handled on.
+        :param ticks: The number of ticks recorded.
+        """
+
+        self.seed = seed
+        self.deterministic = deterministic
+        self.events = events or []
+        self.ticks = ticks
+
+    def record(self, tick: int, event: Event) -> None:
+        """
+        Adds an input handled on a tick.
+        """
+        self.events.append((tick, tuple(event)))
+
+    def script(self) -> Dict[int, List[Event]]:
+        """
+        :return: The inputs recorded, grouped by the tick they were handled on, for World.run.
+        """
+
+        script = {}
+        for tick, event in self.events:
+            script.setdefault(tick, []).append(event)
+        return script
+
+    def replay(self, ticks: int = None) -> World:
+        """
+        Steps a new World through the recorded inputs, as fast as it can.
+
+        :param ticks: The number of ticks to replay, all of them by default.
+        :return: The replayed World. Close it when done with it.
+        """
+
+        world = World(self.seed, self.deterministic)
+        world.setup()
+        world.run(self.ticks if ticks is None else ticks, self.script())
+        return world
+
+    def save(self, path: str) -> None:
+        """
+        Writes the Recording to a JSON file.
+        """
+
+        with open(path, 'w') as file:
+            json.dump({'seed': self.seed, 'deterministic': self.deterministic, 'ticks': self.ticks,
+                       'events': self.events}, file)
+
+    @staticmethod
+    def load(path: str) -> Recording:
+        """
+        Reads a Recording from a JSON file written by save().
+        """
+
+        with open(path) as file:
+            data = json.load(file)
+        events = [(tick, tuple(event)) for tick, event in data['events']]
+        return Recording(data['seed'], data['deterministic'], events, data['ticks'])